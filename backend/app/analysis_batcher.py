@@ -0,0 +1,72 @@
+import asyncio
+import contextvars
+from typing import Dict, Any, List, Tuple, Callable, Optional
+
+
+class AnalysisBatcher:
+    """
+    Micro-batches concurrent request analyses into a single LLM call.
+
+    Callers are parked on a future for up to `window_ms`; the first caller of a
+    window arms a timer and whoever fills the batch flushes it early. The batch
+    is analyzed by `analyze_many` in a worker thread so the event loop keeps
+    accepting requests while the completion is in flight.
+    """
+
+    def __init__(
+        self,
+        analyze_many: Callable[[List[str]], List[Dict[str, Any]]],
+        fallback: Callable[[str], Dict[str, Any]],
+        window_ms: float = 5.0,
+        max_batch_size: int = 16,
+    ):
+        self.analyze_many = analyze_many
+        self.fallback = fallback
+        self.window_ms = window_ms
+        self.max_batch_size = max_batch_size
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.batches_sent = 0
+        self.requests_batched = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.window_ms > 0
+
+    async def submit(self, user_request: str) -> Dict[str, Any]:
+        """Queue a request for the current window and wait for its analysis."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((user_request, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_ms / 1000, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            asyncio.ensure_future(self._run_batch(batch))
+
+    async def _run_batch(self, batch: List[Tuple[str, asyncio.Future]]):
+        user_requests = [user_request for user_request, _ in batch]
+        try:
+            loop = asyncio.get_running_loop()
+            # Executor threads don't inherit contextvars; carry the trace context over
+            context = contextvars.copy_context()
+            results = await loop.run_in_executor(None, context.run, self.analyze_many, user_requests)
+        except Exception as e:
+            print(f"Error in batched LLM analysis: {e}")
+            results = [self.fallback(user_request) for user_request in user_requests]
+
+        self.batches_sent += 1
+        self.requests_batched += len(batch)
+        for (user_request, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
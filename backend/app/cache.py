@@ -0,0 +1,61 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional, List, Tuple
+
+
+class TTLCache:
+    """
+    Size-bounded LRU cache whose entries expire after `ttl` seconds.
+
+    Expiry times are wall-clock so entries can be persisted and reloaded by
+    another process.
+    """
+
+    def __init__(self, max_size: int = 1000, ttl: float = 3600.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, expires_at: Optional[float] = None):
+        with self._lock:
+            self._entries[key] = (expires_at or time.time() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def expires_at(self, key: str) -> Optional[float]:
+        entry = self._entries.get(key)
+        return entry[0] if entry else None
+
+    def export(self) -> List[Tuple[str, float, Any]]:
+        """Unexpired entries as (key, expires_at, value), least recently used first."""
+        now = time.time()
+        with self._lock:
+            return [(key, expires_at, value) for key, (expires_at, value) in self._entries.items() if expires_at > now]
+
+    def load(self, entries: List[Tuple[str, float, Any]]) -> int:
+        """Restore entries produced by `export`, skipping any that have expired since."""
+        now = time.time()
+        loaded = 0
+        for key, expires_at, value in entries:
+            if expires_at > now:
+                self.set(key, value, expires_at)
+                loaded += 1
+        return loaded
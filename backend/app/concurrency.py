@@ -0,0 +1,95 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any
+
+
+class LimitExceeded(Exception):
+    """Raised when a call is shed because its limiter is at capacity."""
+
+    def __init__(self, limiter: "AdaptiveLimiter"):
+        super().__init__(f"{limiter.name} concurrency limit reached ({limiter.in_flight}/{limiter.limit})")
+        self.limiter = limiter
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limit for calls to a dependency.
+
+    Every call that finishes within `latency_target` (and without raising) grows
+    the limit by 1/limit, i.e. by about one per limit's worth of calls. A slow or
+    failed call halves it, at most once per `latency_target` so a burst of slow
+    calls that were already in flight only backs off once. Calls beyond the limit
+    are rejected immediately instead of queueing.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial_limit: float = 20,
+        min_limit: float = 1,
+        max_limit: float = 200,
+        latency_target: float = 2.0,
+        backoff: float = 0.5,
+    ):
+        self.name = name
+        self._limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self.in_flight = 0
+        self.accepted = 0
+        self.shed = 0
+        self.decreases = 0
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self.in_flight >= self.limit:
+                self.shed += 1
+                return False
+            self.in_flight += 1
+            self.accepted += 1
+            return True
+
+    def release(self, latency: float, ok: bool = True):
+        """Return a slot and adjust the limit from the call's outcome."""
+        now = time.monotonic()
+        with self._lock:
+            self.in_flight -= 1
+            if not ok or latency > self.latency_target:
+                if now - self._last_decrease >= self.latency_target:
+                    self._limit = max(self.min_limit, self._limit * self.backoff)
+                    self._last_decrease = now
+                    self.decreases += 1
+            else:
+                self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+
+    @contextmanager
+    def slot(self):
+        """Run the block in a slot, raising LimitExceeded when none is free."""
+        if not self.try_acquire():
+            raise LimitExceeded(self)
+        start = time.monotonic()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            self.release(time.monotonic() - start, ok)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "accepted": self.accepted,
+            "shed": self.shed,
+            "decreases": self.decreases,
+            "latency_target_ms": self.latency_target * 1000,
+        }
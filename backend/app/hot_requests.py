@@ -0,0 +1,98 @@
+import hashlib
+import heapq
+import threading
+from array import array
+from typing import Dict, Any, List, Tuple
+
+KEY_SEPARATOR = "\x1f"
+
+
+class CountMinSketch:
+    """Fixed-size frequency estimator; estimates never undercount."""
+
+    def __init__(self, width: int = 2048, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        self._rows = [array("L", [0]) * width for _ in range(depth)]
+
+    def _columns(self, key: str) -> List[int]:
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8 * self.depth).digest()
+        return [int.from_bytes(digest[8 * row:8 * row + 8], "little") % self.width for row in range(self.depth)]
+
+    def add(self, key: str, count: int = 1) -> int:
+        """Count `key` and return its new estimate."""
+        estimate = None
+        for row, column in zip(self._rows, self._columns(key)):
+            row[column] += count
+            estimate = row[column] if estimate is None else min(estimate, row[column])
+        return estimate
+
+    def estimate(self, key: str) -> int:
+        return min(row[column] for row, column in zip(self._rows, self._columns(key)))
+
+    def halve(self):
+        for row in self._rows:
+            for column in range(self.width):
+                row[column] >>= 1
+
+
+class HotRequestTracker:
+    """
+    Top-K most frequent (request text, category) pairs in fixed memory.
+
+    Every request is counted in a count-min sketch; the K pairs with the
+    highest estimates are kept in a min-heap so a newcomer only has to beat
+    the current minimum. `decay` halves all counts so the ranking follows
+    recent traffic rather than all-time totals.
+    """
+
+    def __init__(self, k: int = 20, width: int = 2048, depth: int = 4):
+        self.k = k
+        self.sketch = CountMinSketch(width, depth)
+        self._top: Dict[str, int] = {}
+        self._heap: List[Tuple[int, str]] = []
+        self._lock = threading.Lock()
+
+    def record(self, normalized_request: str, category: str):
+        key = f"{normalized_request}{KEY_SEPARATOR}{category}"
+        with self._lock:
+            estimate = self.sketch.add(key)
+            if key not in self._top and len(self._top) >= self.k:
+                if estimate <= self._current_min():
+                    return
+                _, evicted = heapq.heappop(self._heap)
+                del self._top[evicted]
+            self._top[key] = estimate
+            heapq.heappush(self._heap, (estimate, key))
+            if len(self._heap) > 4 * self.k:
+                self._rebuild_heap()
+
+    def _current_min(self) -> int:
+        # The heap holds stale (count, key) pairs from earlier updates; skip past them
+        while self._heap:
+            count, key = self._heap[0]
+            if self._top.get(key) == count:
+                return count
+            heapq.heappop(self._heap)
+        return 0
+
+    def _rebuild_heap(self):
+        self._heap = [(count, key) for key, count in self._top.items()]
+        heapq.heapify(self._heap)
+
+    def decay(self):
+        """Halve every count so old traffic fades out."""
+        with self._lock:
+            self.sketch.halve()
+            self._top = {key: count >> 1 for key, count in self._top.items() if count > 1}
+            self._rebuild_heap()
+
+    def top(self) -> List[Dict[str, Any]]:
+        """Current top-K, most frequent first."""
+        with self._lock:
+            ranked = sorted(self._top.items(), key=lambda item: item[1], reverse=True)
+        result = []
+        for key, count in ranked:
+            request, category = key.split(KEY_SEPARATOR, 1)
+            result.append({"request": request, "category": category, "estimated_count": count})
+        return result
@@ -0,0 +1,142 @@
+import gzip
+import hashlib
+import re
+from typing import Dict, Any, List, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # optional: gzip is used when brotli is not installed
+    brotli = None
+
+
+class HTTPCacheStats:
+    """Counters for bytes the middleware kept off the wire."""
+
+    def __init__(self):
+        self.not_modified = 0
+        self.not_modified_bytes_saved = 0
+        self.compressed = 0
+        self.compression_bytes_saved = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "not_modified": self.not_modified,
+            "not_modified_bytes_saved": self.not_modified_bytes_saved,
+            "compressed": self.compressed,
+            "compression_bytes_saved": self.compression_bytes_saved,
+            "brotli_available": brotli is not None,
+        }
+
+
+def etag_for(body: bytes) -> str:
+    """Weak ETag from a hash of the uncompressed body (weak because encodings vary)."""
+    return f'W/"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:]
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in if_none_match.split(","))
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    accepted = {part.split(";")[0].strip().lower() for part in accept_encoding.split(",")}
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+class HTTPCacheMiddleware:
+    """
+    ASGI middleware adding validators, cache policies and compression.
+
+    Buffers each HTTP response (the API only returns small JSON/text bodies) so
+    it can:
+    - add a content-hash ETag to successful GET/HEAD responses and answer a
+      matching If-None-Match with 304 Not Modified
+    - set Cache-Control on 2xx responses from the first matching (path regex,
+      value) policy, and `no-store` on error responses of those paths
+    - gzip or brotli-compress bodies of at least `min_size` bytes
+    WebSocket and lifespan traffic passes straight through.
+    """
+
+    def __init__(self, app, policies: List[Tuple[str, str]], min_size: int = 1024, stats: Optional[HTTPCacheStats] = None):
+        self.app = app
+        self.policies = [(re.compile(pattern), value) for pattern, value in policies]
+        self.min_size = min_size
+        self.stats = stats or HTTPCacheStats()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Dict[str, Any] = {}
+        body_parts: List[bytes] = []
+
+        async def buffer(message):
+            if message["type"] == "http.response.start":
+                start_message.update(message)
+            elif message["type"] == "http.response.body":
+                body_parts.append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    await self._send_response(scope, start_message, b"".join(body_parts), send)
+            else:
+                await send(message)
+
+        await self.app(scope, receive, buffer)
+
+    async def _send_response(self, scope, start_message: Dict[str, Any], body: bytes, send):
+        request_headers = {key.decode("latin-1").lower(): value.decode("latin-1") for key, value in scope["headers"]}
+        headers = [(key, value) for key, value in start_message.get("headers", [])
+                   if key.lower() != b"content-length"]
+        header_names = {key.lower() for key, _ in headers}
+        status = start_message["status"]
+
+        cache_control = self._policy_for(scope["path"])
+        if cache_control and b"cache-control" not in header_names:
+            # Errors (an upstream outage turned 404, a shed 503) must not be cached
+            if not 200 <= status < 300:
+                cache_control = "no-store"
+            headers.append((b"cache-control", cache_control.encode("latin-1")))
+
+        # Decided up front so a 304 carries the same Vary as the 200 it stands in for
+        compressible = len(body) >= self.min_size and b"content-encoding" not in header_names
+        if compressible:
+            headers.append((b"vary", b"Accept-Encoding"))
+
+        if status == 200 and scope["method"] in ("GET", "HEAD"):
+            etag = etag_for(body)
+            headers.append((b"etag", etag.encode("latin-1")))
+            if etag_matches(request_headers.get("if-none-match", ""), etag):
+                self.stats.not_modified += 1
+                self.stats.not_modified_bytes_saved += len(body)
+                # Keep CORS and other metadata headers, drop those describing the omitted body
+                kept = [(key, value) for key, value in headers
+                        if key.lower() not in (b"content-type", b"content-encoding")]
+                await send({"type": "http.response.start", "status": 304, "headers": kept})
+                await send({"type": "http.response.body", "body": b""})
+                return
+
+        if compressible:
+            encoding = choose_encoding(request_headers.get("accept-encoding", ""))
+            if encoding is not None:
+                compressed = brotli.compress(body, quality=5) if encoding == "br" else gzip.compress(body, compresslevel=6)
+                if len(compressed) < len(body):
+                    self.stats.compressed += 1
+                    self.stats.compression_bytes_saved += len(body) - len(compressed)
+                    headers.append((b"content-encoding", encoding.encode("latin-1")))
+                    body = compressed
+
+        headers.append((b"content-length", str(len(body)).encode("latin-1")))
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": b"" if scope["method"] == "HEAD" else body})
+
+    def _policy_for(self, path: str) -> Optional[str]:
+        for pattern, value in self.policies:
+            if pattern.match(path):
+                return value
+        return None
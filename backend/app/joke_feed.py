@@ -0,0 +1,80 @@
+import asyncio
+import time
+from typing import Dict, Any, List, Callable, Optional
+
+from app.joke_index import JokeIndex
+from app.sessions import Session
+
+
+class JokeFeed:
+    """
+    Shared joke source for push subscribers.
+
+    All subscribers draw from the local JokeIndex, each skipping the jokes its
+    own Session has already received. Only when a subscriber runs out of unseen
+    jokes is a batch fetched upstream, and concurrent refills for the same
+    category and filters share a single fetch. A refill that adds nothing new
+    (a small category, filters nothing matches, an upstream error) puts that
+    category and filters on cooldown, so exhausted subscribers repeat local
+    jokes instead of calling upstream on every tick.
+    """
+
+    def __init__(
+        self,
+        joke_index: JokeIndex,
+        fetch: Callable[..., List[Dict[str, Any]]],
+        batch_size: int = 10,
+        refill_cooldown: float = 60.0,
+    ):
+        self.joke_index = joke_index
+        self.fetch = fetch
+        self.batch_size = batch_size
+        self.refill_cooldown = refill_cooldown
+        self.refills = 0
+        self._refills: Dict[str, asyncio.Future] = {}
+        self._cooldown_until: Dict[str, float] = {}
+
+    async def draw(self, category: str, amount: int, filters: Optional[Dict[str, Any]], session: Session) -> List[Dict[str, Any]]:
+        """Return up to `amount` jokes the session has not seen, refilling if needed."""
+        filters = filters or {}
+        mask = self.joke_index.query(category=category, **filters)
+        if self.joke_index.count(mask & ~session.seen) < amount:
+            await self._refill(category, filters)
+            mask = self.joke_index.query(category=category, **filters)
+        # Once everything has been seen, repeats beat silence
+        unseen = mask & ~session.seen
+        jokes = self.joke_index.sample(unseen if unseen else mask, amount)
+        session.mark_seen(self.joke_index.mask_for_ids(joke['id'] for joke in jokes))
+        return jokes
+
+    async def _refill(self, category: str, filters: Dict[str, Any]):
+        key = f"{category}|{sorted(filters.items())}"
+        future = self._refills.get(key)
+        if future is None:
+            if self._cooldown_until.get(key, 0.0) > time.monotonic():
+                return
+            future = asyncio.ensure_future(self._run_refill(key, category, filters))
+            self._refills[key] = future
+            self.refills += 1
+        # Shielded so one subscriber disconnecting doesn't cancel the others' refill
+        await asyncio.shield(future)
+
+    async def _run_refill(self, key: str, category: str, filters: Dict[str, Any]):
+        loop = asyncio.get_running_loop()
+        try:
+            added = await loop.run_in_executor(None, self._fetch_new, category, filters)
+        except Exception as e:
+            print(f"Error refilling joke feed for {category}: {e}")
+            added = 0
+        finally:
+            self._refills.pop(key, None)
+        if not added:
+            now = time.monotonic()
+            self._cooldown_until = {k: until for k, until in self._cooldown_until.items() if until > now}
+            self._cooldown_until[key] = now + self.refill_cooldown
+
+    def _fetch_new(self, category: str, filters: Dict[str, Any]) -> int:
+        """Fetch a batch and return how many matching jokes it added to the index."""
+        before = self.joke_index.count(self.joke_index.query(category=category, **filters))
+        self.fetch(category, self.batch_size, filters)
+        return self.joke_index.count(self.joke_index.query(category=category, **filters)) - before
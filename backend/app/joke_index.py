@@ -0,0 +1,256 @@
+import math
+import random
+import re
+import threading
+from typing import Dict, Any, Optional, List, Iterable
+
+# JokeAPI flag names, in the order they appear in the upstream payload
+FLAG_NAMES = ('nsfw', 'religious', 'political', 'racist', 'sexist', 'explicit')
+
+JOKE_TYPES = ('single', 'twopart')
+
+
+class JokeIndex:
+    """
+    Locally held joke set with bitset indexes over JokeAPI attributes.
+
+    Every joke occupies a slot; each index maps an attribute value to a Python
+    int whose bit N is set when the joke in slot N has that value. A query such
+    as "safe, twopart, Programming, en" is a single bitwise AND of four ints.
+    """
+
+    def __init__(self, max_jokes: int = 5000):
+        self.max_jokes = max_jokes
+        self._jokes: List[Dict[str, Any]] = []
+        self._slots: Dict[int, int] = {}
+        self._all = 0
+        self._safe = 0
+        self._flags: Dict[str, int] = {name: 0 for name in FLAG_NAMES}
+        self._categories: Dict[str, int] = {}
+        self._types: Dict[str, int] = {}
+        self._langs: Dict[str, int] = {}
+        self._terms: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._jokes)
+
+    def add_jokes(self, jokes: Iterable[Dict[str, Any]]) -> int:
+        """
+        Index jokes as returned by JokeAPI. Known IDs are re-indexed in place.
+
+        Returns:
+            Number of jokes that were added or updated
+        """
+        added = 0
+        with self._lock:
+            for joke in jokes:
+                if not isinstance(joke, dict) or 'id' not in joke:
+                    continue
+                slot = self._slots.get(joke['id'])
+                if slot is None:
+                    if len(self._jokes) >= self.max_jokes:
+                        continue
+                    slot = len(self._jokes)
+                    self._jokes.append(joke)
+                    self._slots[joke['id']] = slot
+                else:
+                    self._clear_slot(slot)
+                    self._jokes[slot] = joke
+                self._set_slot(slot, joke)
+                added += 1
+        return added
+
+    def _set_slot(self, slot: int, joke: Dict[str, Any]):
+        bit = 1 << slot
+        self._all |= bit
+        if joke.get('safe'):
+            self._safe |= bit
+        flags = joke.get('flags') or {}
+        for name in FLAG_NAMES:
+            if flags.get(name):
+                self._flags[name] |= bit
+        for index, value in ((self._categories, joke.get('category')),
+                             (self._types, joke.get('type')),
+                             (self._langs, joke.get('lang'))):
+            if value:
+                index[value] = index.get(value, 0) | bit
+        for term in joke_terms(joke):
+            self._terms[term] = self._terms.get(term, 0) | bit
+
+    def _clear_slot(self, slot: int):
+        keep = ~(1 << slot)
+        self._safe &= keep
+        for name in FLAG_NAMES:
+            self._flags[name] &= keep
+        for index in (self._categories, self._types, self._langs, self._terms):
+            for value in index:
+                index[value] &= keep
+
+    def query(
+        self,
+        category: Optional[str] = None,
+        joke_type: Optional[str] = None,
+        lang: Optional[str] = None,
+        safe: Optional[bool] = None,
+        blacklist_flags: Optional[List[str]] = None,
+        contains: Optional[str] = None,
+    ) -> int:
+        """
+        Resolve a filter combination to a bitset of matching slots.
+
+        Args:
+            category: JokeAPI category, comma-separated list, or 'Any'
+            joke_type: 'single' or 'twopart'
+            lang: Language code such as 'en'
+            safe: Restrict to jokes whose `safe` field equals this value
+            blacklist_flags: Exclude jokes carrying any of these flags
+            contains: Case-insensitive substring the joke text must contain
+
+        Returns:
+            Bitset (as int) of matching slots
+        """
+        with self._lock:
+            mask = self._all
+            if category and category != 'Any':
+                category_mask = 0
+                for name in category.split(','):
+                    category_mask |= self._categories.get(name.strip(), 0)
+                mask &= category_mask
+            if joke_type:
+                mask &= self._types.get(joke_type, 0)
+            if lang:
+                mask &= self._langs.get(lang, 0)
+            if safe is True:
+                mask &= self._safe
+            elif safe is False:
+                mask &= ~self._safe
+            for name in blacklist_flags or []:
+                mask &= ~self._flags.get(name, 0)
+            if contains:
+                needle = contains.lower()
+                mask &= self._mask_where(mask, lambda joke: needle in joke_text(joke).lower())
+            return mask
+
+    def _mask_where(self, mask: int, predicate) -> int:
+        result = 0
+        for slot in iter_bits(mask):
+            if predicate(self._jokes[slot]):
+                result |= 1 << slot
+        return result
+
+    def mask_for_ids(self, joke_ids: Iterable[int]) -> int:
+        """Bitset of the slots holding the given joke IDs."""
+        mask = 0
+        with self._lock:
+            for joke_id in joke_ids:
+                slot = self._slots.get(joke_id)
+                if slot is not None:
+                    mask |= 1 << slot
+        return mask
+
+    def count(self, mask: int) -> int:
+        return bin(mask).count('1')
+
+    def jokes(self, mask: int) -> List[Dict[str, Any]]:
+        """All jokes in the bitset, in slot order."""
+        with self._lock:
+            return [self._jokes[slot] for slot in iter_bits(mask)]
+
+    def export(self) -> List[Dict[str, Any]]:
+        """Every held joke, in slot order (re-adding them rebuilds the same index)."""
+        with self._lock:
+            return list(self._jokes)
+
+    def sample(self, mask: int, amount: int) -> List[Dict[str, Any]]:
+        """Up to `amount` random jokes from the bitset."""
+        with self._lock:
+            slots = list(iter_bits(mask))
+            chosen = random.sample(slots, min(amount, len(slots)))
+            return [self._jokes[slot] for slot in chosen]
+
+    def rank(self, keywords: Iterable[str], mask: int, limit: int) -> List[Dict[str, Any]]:
+        """
+        Return up to `limit` jokes from the bitset, most relevant to `keywords` first.
+
+        Scores are accumulated for all jokes at once in a bit-sliced counter:
+        slice k holds bit k of every joke's score, so adding a term's posting
+        bitset is a handful of big-int operations regardless of how many jokes
+        match. Rarer terms are added more than once (an integer IDF weight).
+        Jokes matching no keyword are not returned.
+        """
+        with self._lock:
+            total = max(1, self.count(self._all))
+            slices: List[int] = []
+            max_score = 0
+            for term in set(normalize_terms(keywords)):
+                postings = self._terms.get(term, 0) & mask
+                if not postings:
+                    continue
+                weight = 1 + int(math.log2(total / self.count(self._terms[term])))
+                for _ in range(weight):
+                    _add_to_counter(slices, postings)
+                max_score += weight
+
+            ranked: List[Dict[str, Any]] = []
+            for score in range(max_score, 0, -1):
+                if score >> len(slices):
+                    continue
+                tier = mask
+                for k, score_slice in enumerate(slices):
+                    tier &= score_slice if score >> k & 1 else ~score_slice
+                if tier:
+                    slots = list(iter_bits(tier))
+                    random.shuffle(slots)
+                    ranked.extend(self._jokes[slot] for slot in slots[:limit - len(ranked)])
+                    if len(ranked) >= limit:
+                        break
+            return ranked
+
+    def get(self, joke_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            slot = self._slots.get(joke_id)
+            return self._jokes[slot] if slot is not None else None
+
+
+def iter_bits(mask: int):
+    """Yield the positions of the set bits in `mask`, lowest first."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def joke_text(joke: Dict[str, Any]) -> str:
+    """Full text of a single or two-part joke."""
+    if joke.get('type') == 'twopart':
+        return f"{joke.get('setup', '')} {joke.get('delivery', '')}"
+    return joke.get('joke', '')
+
+
+def _add_to_counter(slices: List[int], bits: int):
+    """Add 1 to every joke in `bits` in a bit-sliced counter (ripple carry)."""
+    k = 0
+    while bits:
+        if k == len(slices):
+            slices.append(0)
+        carry = slices[k] & bits
+        slices[k] ^= bits
+        bits = carry
+        k += 1
+
+
+def normalize_terms(texts: Iterable[str]) -> List[str]:
+    """Lower-case words of two or more letters with a naive plural strip."""
+    terms = []
+    for text in texts:
+        for word in re.findall(r'[a-z]{2,}', str(text).lower()):
+            if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+                word = word[:-1]
+            terms.append(word)
+    return terms
+
+
+def joke_terms(joke: Dict[str, Any]) -> set:
+    """Searchable terms of a joke: its text plus its category name."""
+    return set(normalize_terms([joke_text(joke), joke.get('category', '')]))
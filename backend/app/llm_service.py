@@ -1,27 +1,128 @@
+import asyncio
+import contextvars
 import os
-import openai
+import time
 from typing import Dict, Any, Optional, List, Tuple
 import json
 import re
 from collections import Counter
 from dotenv import load_dotenv
+from app.analysis_batcher import AnalysisBatcher
+from app.tracing import tracer
+from app.cache import TTLCache
+from app.concurrency import AdaptiveLimiter, LimitExceeded
 
 # Load environment variables
 load_dotenv()
 
+ANALYSIS_SYSTEM_PROMPT = """
+            You are an expert AI assistant that deeply analyzes user requests for jokes by understanding the full context, intent, and emotional state of the user.
+
+            Available joke categories: Programming, Dark, Misc, Pun, Spooky, Christmas, Any
+
+            Your task is to perform a comprehensive contextual analysis:
+
+            1. **Context Understanding**: Analyze the full sentence structure, tone, and implied meaning
+            2. **Intent Recognition**: Understand what the user is really asking for, not just keywords
+            3. **Emotional Analysis**: Detect the user's mood, stress level, or emotional state
+            4. **Situational Context**: Consider the context (work, social, holiday, etc.)
+            5. **Category Selection**: Choose the most appropriate joke category based on context
+            6. **Keyword Extraction**: Identify relevant themes and topics for better joke matching
+
+            **Context Analysis Guidelines:**
+            - "I'm having a bad day" → Consider uplifting or relatable humor (Misc, or Dark if they seem to want edgy humor)
+            - "I'm stuck debugging code" → Programming jokes with relatable developer experiences
+            - "I need something clever" → Pun or witty humor
+            - "It's been a stressful week" → Consider stress-relief humor (Misc, or Dark for cathartic humor)
+            - "I want to impress my friends" → Clever or impressive humor (Pun, Programming)
+            - "I'm feeling festive" → Christmas or celebratory humor
+            - "I need a laugh" → Any category, focus on humor quality
+            - "Tell me something funny about work" → Programming (if tech work) or Misc (general work)
+            - "I'm bored" → Engaging, varied humor (Misc, Programming)
+            - "I want something different" → Consider less common categories (Spooky, Dark, Pun)
+
+            **Category Selection Logic:**
+            - Programming: Tech work, coding, computers, software, developer life
+            - Dark: When user seems to want edgy, cathartic, or boundary-pushing humor
+            - Misc: General humor, everyday situations, relatable content
+            - Pun: When user wants clever wordplay or intellectual humor
+            - Spooky: Halloween, horror themes, supernatural interests
+            - Christmas: Holiday cheer, festive mood, seasonal humor
+            - Any: When context is unclear or user wants variety
+
+            Return a JSON object with the following structure:
+            {
+                "category": "string (one of the available categories)",
+                "keywords": ["array of relevant keywords and themes"],
+                "reasoning": "detailed explanation of your contextual analysis",
+                "user_mood": "string describing the user's apparent mood, emotional state, or context",
+                "suggested_amount": "number (1-10) of jokes to fetch based on context"
+            }
+
+            **Important**: Focus on understanding the user's situation, emotional state, and intent rather than just matching keywords. Consider the broader context of their request.
+            """
+
+BATCH_ANALYSIS_INSTRUCTIONS = """
+            You will receive several independent requests, each prefixed with its numeric id.
+            Analyze every request on its own and return a JSON array with one object per request,
+            using the structure above plus an "id" field holding the request's id.
+            Return only the JSON array.
+            """
+
+# Set on fallback analyses produced after a failed LLM call so they are not cached
+FALLBACK_FLAG = "_fallback"
+
+def normalize_request(user_request: str) -> str:
+    """Cache key for a request: lower-cased with whitespace collapsed."""
+    return " ".join(user_request.lower().split())
+
 class LLMService:
     """Service for handling LLM interactions to understand user requests."""
     
     def __init__(self):
-        self.client = None
-        self._initialize_client()
+        # The OpenAI client (and the openai import) is deferred until first use
+        self._client = None
+        self._client_initialized = False
         self._initialize_nlp_data()
+        self.analysis_cache = TTLCache(
+            max_size=int(os.getenv("ANALYSIS_CACHE_SIZE", "1000")),
+            ttl=float(os.getenv("ANALYSIS_CACHE_TTL", "3600")),
+        )
+        self.context_cache = TTLCache(
+            max_size=int(os.getenv("CONTEXT_CACHE_SIZE", "1000")),
+            ttl=float(os.getenv("CONTEXT_CACHE_TTL", "600")),
+        )
+        # Adaptive limit on concurrent OpenAI calls; only real calls take a slot
+        self.limiter = AdaptiveLimiter(
+            "llm",
+            initial_limit=int(os.getenv("LLM_CONCURRENCY_INITIAL", "20")),
+            max_limit=int(os.getenv("LLM_CONCURRENCY_MAX", "200")),
+            latency_target=float(os.getenv("LLM_LATENCY_TARGET_MS", "3000")) / 1000
+        )
+        self.batcher = AnalysisBatcher(
+            self._analyze_many,
+            self._failed_analysis,
+            window_ms=float(os.getenv("ANALYSIS_BATCH_WINDOW_MS", "5")),
+            max_batch_size=int(os.getenv("ANALYSIS_BATCH_MAX_SIZE", "16")),
+        )
+    
+    @property
+    def client(self):
+        if not self._client_initialized:
+            self._initialize_client()
+        return self._client
+    
+    @client.setter
+    def client(self, value):
+        self._client = value
+        self._client_initialized = True
     
     def _initialize_client(self):
         """Initialize OpenAI client only if API key is available."""
         api_key = os.getenv("OPENAI_API_KEY")
         if api_key:
             try:
+                import openai
                 self.client = openai.OpenAI(api_key=api_key)
             except Exception as e:
                 print(f"Error initializing OpenAI client: {e}")
@@ -215,76 +316,73 @@ class LLMService:
         
         return final_amount
     
-    async def analyze_request(self, user_request: str) -> Dict[str, Any]:
+    async def analyze_request(self, user_request: str, refresh: bool = False) -> Dict[str, Any]:
         """
         Use LLM to analyze user request and extract relevant information for joke fetching.
         
         Args:
             user_request: The natural language request from the user
+            refresh: Ignore any cached analysis and replace it with a fresh one
             
         Returns:
             Dictionary containing extracted parameters for joke API
+            
+        Raises:
+            LimitExceeded: The LLM concurrency limit is reached (cache hits are still served)
         """
-        if not self._is_llm_available():
-            return self._fallback_analysis(user_request)
-        
-        try:
-            system_prompt = """
-            You are an expert AI assistant that deeply analyzes user requests for jokes by understanding the full context, intent, and emotional state of the user.
-
-            Available joke categories: Programming, Dark, Misc, Pun, Spooky, Christmas, Any
-
-            Your task is to perform a comprehensive contextual analysis:
-
-            1. **Context Understanding**: Analyze the full sentence structure, tone, and implied meaning
-            2. **Intent Recognition**: Understand what the user is really asking for, not just keywords
-            3. **Emotional Analysis**: Detect the user's mood, stress level, or emotional state
-            4. **Situational Context**: Consider the context (work, social, holiday, etc.)
-            5. **Category Selection**: Choose the most appropriate joke category based on context
-            6. **Keyword Extraction**: Identify relevant themes and topics for better joke matching
-
-            **Context Analysis Guidelines:**
-            - "I'm having a bad day" → Consider uplifting or relatable humor (Misc, or Dark if they seem to want edgy humor)
-            - "I'm stuck debugging code" → Programming jokes with relatable developer experiences
-            - "I need something clever" → Pun or witty humor
-            - "It's been a stressful week" → Consider stress-relief humor (Misc, or Dark for cathartic humor)
-            - "I want to impress my friends" → Clever or impressive humor (Pun, Programming)
-            - "I'm feeling festive" → Christmas or celebratory humor
-            - "I need a laugh" → Any category, focus on humor quality
-            - "Tell me something funny about work" → Programming (if tech work) or Misc (general work)
-            - "I'm bored" → Engaging, varied humor (Misc, Programming)
-            - "I want something different" → Consider less common categories (Spooky, Dark, Pun)
-
-            **Category Selection Logic:**
-            - Programming: Tech work, coding, computers, software, developer life
-            - Dark: When user seems to want edgy, cathartic, or boundary-pushing humor
-            - Misc: General humor, everyday situations, relatable content
-            - Pun: When user wants clever wordplay or intellectual humor
-            - Spooky: Halloween, horror themes, supernatural interests
-            - Christmas: Holiday cheer, festive mood, seasonal humor
-            - Any: When context is unclear or user wants variety
-
-            Return a JSON object with the following structure:
-            {
-                "category": "string (one of the available categories)",
-                "keywords": ["array of relevant keywords and themes"],
-                "reasoning": "detailed explanation of your contextual analysis",
-                "user_mood": "string describing the user's apparent mood, emotional state, or context",
-                "suggested_amount": "number (1-10) of jokes to fetch based on context"
-            }
-
-            **Important**: Focus on understanding the user's situation, emotional state, and intent rather than just matching keywords. Consider the broader context of their request.
-            """
+        with tracer.span("analyze_request", batched=self.batcher.enabled):
+            if not self._is_llm_available():
+                return self._fallback_analysis(user_request)
             
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": f"Please analyze this request with full contextual understanding: {user_request}"}
-                ],
-                temperature=0.4,
-                max_tokens=400
-            )
+            cache_key = normalize_request(user_request)
+            cached = None if refresh else self.analysis_cache.get(cache_key)
+            if cached is not None:
+                return dict(cached)
+            
+            # A slot is held until the (possibly batched) completion returns; a
+            # fallback means the call failed, which backs the limit off
+            if not self.limiter.try_acquire():
+                raise LimitExceeded(self.limiter)
+            start = time.monotonic()
+            ok = False
+            try:
+                if self.batcher.enabled:
+                    result = await self.batcher.submit(user_request)
+                else:
+                    result = await self._run_blocking(self._analyze_single, user_request)
+                ok = not result.pop(FALLBACK_FLAG, False)
+            finally:
+                self.limiter.release(time.monotonic() - start, ok)
+            
+            # Only real LLM analyses are cached; a fallback is retried next time
+            if ok:
+                self.analysis_cache.set(cache_key, result)
+            return dict(result)
+    
+    async def _run_blocking(self, func, *args):
+        """Run a blocking OpenAI call in a worker thread, keeping the trace context."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, contextvars.copy_context().run, func, *args)
+    
+    def _analyze_many(self, user_requests: List[str]) -> List[Dict[str, Any]]:
+        """Analyze a batch of requests, using the single-request prompt for a batch of one."""
+        if len(user_requests) == 1:
+            return [self._analyze_single(user_requests[0])]
+        return self._analyze_batch(user_requests)
+    
+    def _analyze_single(self, user_request: str) -> Dict[str, Any]:
+        """Analyze one request with its own chat completion."""
+        try:
+            with tracer.span("openai chat.completions", purpose="analysis", batch_size=1):
+                response = self.client.chat.completions.create(
+                    model="gpt-3.5-turbo",
+                    messages=[
+                        {"role": "system", "content": ANALYSIS_SYSTEM_PROMPT},
+                        {"role": "user", "content": f"Please analyze this request with full contextual understanding: {user_request}"}
+                    ],
+                    temperature=0.4,
+                    max_tokens=400
+                )
             
             # Extract and parse the JSON response
             content = response.choices[0].message.content
@@ -294,20 +392,92 @@ class LLMService:
                 json_end = content.rfind('}') + 1
                 if json_start != -1 and json_end != 0:
                     json_str = content[json_start:json_end]
-                    result = json.loads(json_str)
+                    with tracer.span("parse_analysis_json"):
+                        result = json.loads(json_str)
                 else:
                     # Fallback if no JSON found
-                    result = self._fallback_analysis(user_request)
+                    result = self._failed_analysis(user_request)
                 
                 return result
                 
             except json.JSONDecodeError:
                 # Fallback if JSON parsing fails
-                return self._fallback_analysis(user_request)
+                return self._failed_analysis(user_request)
                 
         except Exception as e:
             print(f"Error in LLM analysis: {e}")
-            return self._fallback_analysis(user_request)
+            return self._failed_analysis(user_request)
+    
+    def _analyze_batch(self, user_requests: List[str]) -> List[Dict[str, Any]]:
+        """
+        Analyze several requests with one chat completion.
+        
+        The shared system prompt is sent once for the whole batch. Items missing
+        from the returned JSON array, or malformed, get the fallback analysis.
+        """
+        numbered = "\n".join(f"{i}: {request}" for i, request in enumerate(user_requests))
+        results: Dict[int, Dict[str, Any]] = {}
+        try:
+            with tracer.span("openai chat.completions", purpose="analysis", batch_size=len(user_requests)):
+                response = self.client.chat.completions.create(
+                    model="gpt-3.5-turbo",
+                    messages=[
+                        {"role": "system", "content": ANALYSIS_SYSTEM_PROMPT + BATCH_ANALYSIS_INSTRUCTIONS},
+                        {"role": "user", "content": f"Please analyze these requests with full contextual understanding:\n{numbered}"}
+                    ],
+                    temperature=0.4,
+                    max_tokens=min(400 * len(user_requests), 4000)
+                )
+            with tracer.span("parse_batch_analysis", batch_size=len(user_requests)):
+                results = self._parse_batch_analysis(response.choices[0].message.content, len(user_requests))
+        except Exception as e:
+            print(f"Error in batched LLM analysis: {e}")
+        
+        return [
+            results.get(i) or self._failed_analysis(request)
+            for i, request in enumerate(user_requests)
+        ]
+    
+    def _parse_batch_analysis(self, content: str, size: int) -> Dict[int, Dict[str, Any]]:
+        """
+        Map request ids to analyses from a batched response, skipping unusable items.
+        
+        Items are decoded one object at a time so a malformed or truncated item
+        (e.g. when max_tokens cuts the array short) only costs that item.
+        """
+        json_start = content.find('[')
+        if json_start == -1:
+            return {}
+        
+        decoder = json.JSONDecoder()
+        items = []
+        in_order = True
+        position = content.find('{', json_start)
+        while position != -1:
+            try:
+                item, end = decoder.raw_decode(content, position)
+                items.append(item)
+            except json.JSONDecodeError:
+                # Positions no longer line up with request ids after a bad item
+                in_order = False
+                end = position + 1
+            position = content.find('{', end)
+        
+        results = {}
+        required = ('category', 'keywords', 'reasoning', 'user_mood', 'suggested_amount')
+        for position, item in enumerate(items):
+            if not isinstance(item, dict) or not all(key in item for key in required):
+                continue
+            item_id = item.pop('id', position if in_order else None)
+            if isinstance(item_id, int) and 0 <= item_id < size:
+                results[item_id] = item
+        return results
+    
+    def _failed_analysis(self, user_request: str) -> Dict[str, Any]:
+        """Fallback analysis for a failed LLM call, flagged so it isn't cached."""
+        result = self._fallback_analysis(user_request)
+        result[FALLBACK_FLAG] = True
+        return result
     
     def _fallback_analysis(self, user_request: str) -> Dict[str, Any]:
         """
@@ -501,20 +671,46 @@ class LLMService:
         
         return " ".join(reasoning_parts)
     
-    async def generate_response_context(self, user_request: str, jokes_data: list) -> str:
+    async def generate_response_context(self, user_request: str, jokes_data: list, refresh: bool = False) -> str:
         """
         Use LLM to generate contextual response based on user request and fetched jokes.
         
+        The response is cached per request text and reused for whichever jokes
+        are served later, so the LLM is only given the request, never the jokes:
+        a cached intro can't describe jokes that aren't in the response. The
+        generic intro used when the LLM call fails is not cached.
+        
         Args:
             user_request: Original user request
             jokes_data: List of jokes fetched from API
+            refresh: Ignore any cached response and replace it with a fresh one
             
         Returns:
             Contextual response string
         """
-        if not self._is_llm_available():
-            return f"Here are some jokes based on your request: '{user_request}'"
-        
+        with tracer.span("generate_response_context", jokes=len(jokes_data)):
+            if not self._is_llm_available():
+                return self._fallback_response_context(user_request)
+            
+            cache_key = normalize_request(user_request)
+            cached = None if refresh else self.context_cache.get(cache_key)
+            if cached is not None:
+                return cached
+            
+            try:
+                context = await self._run_blocking(self._generate_response_context, user_request, [])
+            except LimitExceeded:
+                raise
+            except Exception:
+                return self._fallback_response_context(user_request)
+            self.context_cache.set(cache_key, context)
+            return context
+    
+    def _fallback_response_context(self, user_request: str) -> str:
+        return f"Here are some jokes based on your request: '{user_request}'"
+    
+    def _generate_response_context(self, user_request: str, jokes_data: list) -> str:
+        """Ask the LLM for an intro; raises if the call fails."""
         try:
             system_prompt = """
             You are a friendly, empathetic AI assistant that provides jokes with personalized context. 
@@ -540,23 +736,29 @@ class LLMService:
             Be empathetic and understanding of the user's situation.
             """
             
-            jokes_text = "\n".join([
-                f"Joke {i+1}: {joke.get('setup', joke.get('joke', ''))} {joke.get('delivery', '')}"
-                for i, joke in enumerate(jokes_data)
-            ])
+            user_message = f"User request: {user_request}"
+            if jokes_data:
+                jokes_text = "\n".join([
+                    f"Joke {i+1}: {joke.get('setup', joke.get('joke', ''))} {joke.get('delivery', '')}"
+                    for i, joke in enumerate(jokes_data)
+                ])
+                user_message += f"\n\nJokes:\n{jokes_text}"
             
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": f"User request: {user_request}\n\nJokes:\n{jokes_text}"}
-                ],
-                temperature=0.7,
-                max_tokens=200
-            )
+            with tracer.span("openai chat.completions", purpose="response_context"), self.limiter.slot():
+                response = self.client.chat.completions.create(
+                    model="gpt-3.5-turbo",
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_message}
+                    ],
+                    temperature=0.7,
+                    max_tokens=200
+                )
             
             return response.choices[0].message.content
             
+        except LimitExceeded:
+            raise
         except Exception as e:
             print(f"Error generating response context: {e}")
-            return f"Here are some jokes based on your request: '{user_request}'" 
\ No newline at end of file
+            raise 
\ No newline at end of file
@@ -1,10 +1,23 @@
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Depends, Request, Header, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-import requests
+from fastapi.responses import PlainTextResponse, JSONResponse
 from pydantic import BaseModel
-from typing import Optional, List, Union
+from typing import Optional, List, Set, Union, Dict, Any
+import asyncio
+import hmac
+import os
 import re
-from app.llm_service import LLMService
+import time
+from app.llm_service import LLMService, normalize_request
+from app.joke_index import JokeIndex, FLAG_NAMES, JOKE_TYPES
+from app.tracing import tracer
+from app import profiling
+from app.warm_state import save_snapshot, load_snapshot
+from app.concurrency import AdaptiveLimiter, LimitExceeded
+from app.sessions import Session, SessionStore
+from app.joke_feed import JokeFeed
+from app.http_cache import HTTPCacheMiddleware, HTTPCacheStats
+from app.hot_requests import HotRequestTracker
 
 app = FastAPI(title="AI-Powered Joke Search API")
 
@@ -17,9 +30,179 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize LLM service
+# Per-route Cache-Control; the first matching path pattern wins
+CACHE_POLICIES = [
+    (r"^/api/admin/", "no-store"),
+    (r"^/api/categories$", "public, max-age=3600"),
+    (r"^/api/joke/\d+$", "public, max-age=86400"),
+    (r"^/api/search$", "no-cache"),
+    (r"^/$", "public, max-age=300"),
+]
+
+# ETags, 304s and response compression
+http_cache_stats = HTTPCacheStats()
+app.add_middleware(
+    HTTPCacheMiddleware,
+    policies=CACHE_POLICIES,
+    min_size=int(os.getenv("COMPRESSION_MIN_SIZE", "1024")),
+    stats=http_cache_stats
+)
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """Open a trace per request and return its ID in the X-Trace-Id header."""
+    with tracer.trace(f"{request.method} {request.url.path}", query=str(request.url.query)) as trace:
+        response = await call_next(request)
+        if trace is not None:
+            trace.attributes["status_code"] = response.status_code
+            response.headers["X-Trace-Id"] = trace.trace_id
+        return response
+
+# Initialize LLM service (cheap: the OpenAI client is created on first use)
 llm_service = LLMService()
 
+JOKEAPI_BASE_URL = "https://v2.jokeapi.dev"
+
+# Locally held jokes, populated from every upstream response
+joke_index = JokeIndex()
+
+# Candidates fetched per relevance-ranked request (JokeAPI's maximum amount)
+RELEVANT_CANDIDATES = 10
+
+# WebSocket feed: subscribers share the local index; refills are coalesced per category
+joke_feed = JokeFeed(
+    joke_index,
+    lambda category, amount, filters: fetch_jokes(category, amount, filters),
+    RELEVANT_CANDIDATES,
+    refill_cooldown=float(os.getenv("WS_REFILL_COOLDOWN", "60"))
+)
+WS_MIN_INTERVAL = float(os.getenv("WS_MIN_INTERVAL", "1"))
+WS_SEND_QUEUE = int(os.getenv("WS_SEND_QUEUE", "4"))
+
+# Most frequent /api/ask phrasings, kept warm by a background refresh
+hot_requests = HotRequestTracker(k=int(os.getenv("HOT_REQUESTS_TOP_K", "20")))
+HOT_REFRESH_INTERVAL = float(os.getenv("HOT_REFRESH_INTERVAL", "60"))
+# Categories of the current hot requests; their jokes are prefetched into the index each
+# round, so unfiltered requests for them are served locally instead of going upstream
+hot_categories: Set[str] = set()
+
+# Per-client record of delivered jokes, keyed by the X-Session-Id header
+session_store = SessionStore(
+    max_sessions=int(os.getenv("SESSION_MAX", "10000")),
+    idle_ttl=float(os.getenv("SESSION_IDLE_TTL", "1800"))
+)
+
+# Warm-state snapshot: jokes and analysis cache survive restarts when set
+WARM_STATE_PATH = os.getenv("WARM_STATE_PATH")
+WARM_STATE_INTERVAL = float(os.getenv("WARM_STATE_INTERVAL", "300"))
+
+class UpstreamError(Exception):
+    """A JokeAPI request failed (connection error or non-2xx status)."""
+
+# Adaptive concurrency limits; calls over the limit are shed instead of queueing
+llm_limiter = llm_service.limiter
+upstream_limiter = AdaptiveLimiter(
+    "jokeapi",
+    initial_limit=int(os.getenv("UPSTREAM_CONCURRENCY_INITIAL", "20")),
+    max_limit=int(os.getenv("UPSTREAM_CONCURRENCY_MAX", "200")),
+    latency_target=float(os.getenv("UPSTREAM_LATENCY_TARGET_MS", "1000")) / 1000
+)
+UPSTREAM_TIMEOUT = float(os.getenv("UPSTREAM_TIMEOUT", "10"))
+RETRY_AFTER_SECONDS = int(os.getenv("SHED_RETRY_AFTER", "1"))
+
+def overloaded_response(error: LimitExceeded) -> JSONResponse:
+    return JSONResponse(
+        status_code=503,
+        content={"detail": f"Server busy ({error.limiter.name}), retry shortly"},
+        headers={"Retry-After": str(RETRY_AFTER_SECONDS)}
+    )
+
+@app.exception_handler(LimitExceeded)
+async def handle_limit_exceeded(request: Request, error: LimitExceeded):
+    return overloaded_response(error)
+
+async def persist_warm_state():
+    """Periodically snapshot warm state without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(WARM_STATE_INTERVAL)
+        try:
+            await loop.run_in_executor(None, save_snapshot, WARM_STATE_PATH, joke_index, llm_service.analysis_cache)
+        except OSError as e:
+            print(f"Error saving warm-state snapshot: {e}")
+
+@app.on_event("startup")
+async def restore_warm_state():
+    if not WARM_STATE_PATH:
+        return
+    restored = load_snapshot(WARM_STATE_PATH, joke_index, llm_service.analysis_cache)
+    if restored:
+        print(f"Restored warm state from {WARM_STATE_PATH}: {restored}")
+    app.state.warm_state_task = asyncio.create_task(persist_warm_state())
+
+async def refresh_hot_request(user_request: str):
+    """
+    Re-populate caches for one hot request before they expire.
+
+    Entries expiring within two refresh intervals are renewed, so a hot request
+    never finds its analysis or context response missing.
+    """
+    if not llm_service._is_llm_available():
+        return
+
+    key = normalize_request(user_request)
+    horizon = time.time() + 2 * HOT_REFRESH_INTERVAL
+    if (llm_service.analysis_cache.expires_at(key) or 0) < horizon:
+        await llm_service.analyze_request(user_request, refresh=True)
+    if (llm_service.context_cache.expires_at(key) or 0) < horizon:
+        await llm_service.generate_response_context(user_request, [], refresh=True)
+
+async def refresh_hot_requests():
+    """Periodically warm caches for the current top-K requests, then age the counts."""
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(HOT_REFRESH_INTERVAL)
+        entries = hot_requests.top()
+        # One prefetch per category, however many hot requests share it
+        prefetched = set()
+        for category in dict.fromkeys(entry["category"] for entry in entries):
+            try:
+                await loop.run_in_executor(None, fetch_jokes, category, RELEVANT_CANDIDATES)
+                prefetched.add(category)
+            except LimitExceeded:
+                break
+            except Exception as e:
+                print(f"Error prefetching {category} jokes for hot requests: {e}")
+        hot_categories.clear()
+        hot_categories.update(prefetched)
+        for entry in entries:
+            try:
+                await refresh_hot_request(entry["request"])
+            except LimitExceeded:
+                # Live traffic has priority; try again next round
+                break
+            except Exception as e:
+                print(f"Error refreshing hot request {entry['request']!r}: {e}")
+        hot_requests.decay()
+
+@app.on_event("startup")
+async def start_hot_request_refresh():
+    if HOT_REFRESH_INTERVAL > 0:
+        app.state.hot_refresh_task = asyncio.create_task(refresh_hot_requests())
+
+@app.on_event("shutdown")
+def shutdown():
+    if HOT_REFRESH_INTERVAL > 0:
+        app.state.hot_refresh_task.cancel()
+    if WARM_STATE_PATH:
+        app.state.warm_state_task.cancel()
+        try:
+            save_snapshot(WARM_STATE_PATH, joke_index, llm_service.analysis_cache)
+        except OSError as e:
+            print(f"Error saving warm-state snapshot: {e}")
+    if tracer.exporter is not None:
+        tracer.exporter.close()
+
 class JokeResponse(BaseModel):
     error: bool
     category: str
@@ -80,50 +263,234 @@ def extract_category(request: str) -> str:
     
     return 'Any'
 
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Admin endpoints only exist when ADMIN_TOKEN is set, and require it in X-Admin-Token."""
+    admin_token = os.getenv("ADMIN_TOKEN")
+    if not admin_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token.encode(), admin_token.encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+def joke_filters(
+    safe: Optional[bool] = None,
+    joke_type: Optional[str] = Query(None, alias="type", pattern="^(single|twopart)$"),
+    lang: Optional[str] = None,
+    blacklist_flags: Optional[str] = Query(None, description="Comma-separated flags to exclude"),
+) -> Dict[str, Any]:
+    """Attribute filters shared by the joke endpoints."""
+    flags = [flag.strip() for flag in blacklist_flags.split(',') if flag.strip()] if blacklist_flags else None
+    for flag in flags or []:
+        if flag not in FLAG_NAMES:
+            raise HTTPException(status_code=400, detail=f"Unknown flag: {flag}")
+    return {
+        "safe": safe,
+        "joke_type": joke_type,
+        "lang": lang,
+        "blacklist_flags": flags,
+    }
+
+def has_filters(filters: Optional[Dict[str, Any]]) -> bool:
+    return bool(filters) and any(value is not None for value in filters.values())
+
+def jokeapi_get(path: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """GET a JokeAPI endpoint and decode the JSON body, tracing both steps."""
+    # Imported here so the first request, not worker startup, pays for it
+    import requests
+
+    with tracer.span("http GET jokeapi", path=path, params=params):
+        with upstream_limiter.slot():
+            try:
+                response = requests.get(f"{JOKEAPI_BASE_URL}{path}", params=params, timeout=UPSTREAM_TIMEOUT)
+            except requests.RequestException as e:
+                raise UpstreamError(str(e)) from e
+            if response.status_code >= 500:
+                raise UpstreamError(f"JokeAPI returned {response.status_code}")
+        # 4xx (unknown id, nothing matched) is about the request, not JokeAPI's health,
+        # so it is raised outside the slot and doesn't back the limit off
+        try:
+            response.raise_for_status()
+        except requests.HTTPError as e:
+            raise UpstreamError(str(e)) from e
+    with tracer.span("parse_json", bytes=len(response.content)):
+        try:
+            return response.json()
+        except ValueError as e:
+            raise UpstreamError(f"Invalid JSON from JokeAPI: {e}") from e
+
+def format_jokes(jokes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    with tracer.span("format_jokes", count=len(jokes)):
+        return [format_joke(joke) for joke in jokes]
+
+def format_joke(joke: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a JokeAPI joke to the response shape used by the frontend."""
+    if joke.get('type') == 'twopart':
+        return {
+            "category": joke['category'],
+            "setup": joke['setup'],
+            "delivery": joke['delivery'],
+            "is_safe": joke['safe']
+        }
+    return {
+        "category": joke['category'],
+        "joke": joke['joke'],
+        "is_safe": joke['safe']
+    }
+
+def fetch_jokes(
+    category: str,
+    amount: int,
+    filters: Optional[Dict[str, Any]] = None,
+    contains: Optional[str] = None,
+    error_detail: str = "Error fetching joke",
+) -> List[Dict[str, Any]]:
+    """Fetch jokes from JokeAPI and add them to the local index."""
+    filters = filters or {}
+    params: Dict[str, Any] = {"amount": amount}
+    if contains:
+        params["contains"] = contains
+    if filters.get("joke_type"):
+        params["type"] = filters["joke_type"]
+    if filters.get("lang"):
+        params["lang"] = filters["lang"]
+    if filters.get("blacklist_flags"):
+        params["blacklistFlags"] = ",".join(filters["blacklist_flags"])
+    if filters.get("safe"):
+        params["safe-mode"] = ""
+
+    data = jokeapi_get(f"/joke/{category}", params)
+
+    if data.get('error'):
+        raise HTTPException(status_code=400, detail=data.get('message', error_detail))
+
+    # Handle both single joke and multiple jokes response
+    jokes = data.get('jokes', [data])
+    joke_index.add_jokes(jokes)
+
+    if has_filters(filters):
+        # JokeAPI has no equivalent for every filter (e.g. safe=false), so re-check locally
+        fetched = joke_index.mask_for_ids(joke.get('id') for joke in jokes)
+        jokes = joke_index.jokes(fetched & joke_index.query(category=category, contains=contains, **filters))
+    return jokes
+
+def mark_delivered(session: Optional[Session], jokes: List[Dict[str, Any]]):
+    if session is not None:
+        session.mark_seen(joke_index.mask_for_ids(joke.get('id') for joke in jokes))
+
+def drop_seen(jokes: List[Dict[str, Any]], session: Optional[Session]) -> List[Dict[str, Any]]:
+    """Remove jokes the session has already been given."""
+    if session is None:
+        return jokes
+    return [joke for joke in jokes if not joke_index.mask_for_ids([joke.get('id')]) & session.seen]
+
+def select_jokes(
+    category: str,
+    amount: int,
+    filters: Optional[Dict[str, Any]] = None,
+    session: Optional[Session] = None
+) -> List[Dict[str, Any]]:
+    """
+    Pick jokes for a request.
+
+    Filtered requests, and requests for a hot category, are served from the
+    local index when it already holds enough matches; everything else goes
+    upstream, which also grows the index.
+    With a session, jokes it has already seen are skipped and replaced from the
+    local index where possible.
+    """
+    seen = session.seen if session else 0
+    if has_filters(filters) or category in hot_categories:
+        mask = joke_index.query(category=category, **(filters or {})) & ~seen
+        if joke_index.count(mask) >= amount:
+            jokes = joke_index.sample(mask, amount)
+            mark_delivered(session, jokes)
+            return jokes
+
+    jokes = fetch_jokes(category, amount, filters)
+    if session is not None:
+        fresh = drop_seen(jokes, session)
+        if len(fresh) < amount:
+            local = joke_index.query(category=category, **(filters or {}))
+            local &= ~(seen | joke_index.mask_for_ids(joke.get('id') for joke in fresh))
+            fresh.extend(joke_index.sample(local, amount - len(fresh)))
+        # Once everything has been seen, a repeat beats an empty answer
+        jokes = fresh or jokes
+        mark_delivered(session, jokes)
+    return jokes
+
+def select_relevant_jokes(
+    category: str,
+    amount: int,
+    keywords: List[str],
+    filters: Optional[Dict[str, Any]] = None,
+    session: Optional[Session] = None
+) -> List[Dict[str, Any]]:
+    """
+    Pick the jokes that best match the analysis keywords.
+
+    Over-fetches a batch of candidates (which also grows the local index), then
+    ranks every locally held joke in the category against the keywords. Slots
+    that no keyword matches are filled with random candidates. Hot categories
+    skip the over-fetch while the index holds a batch's worth of matches.
+    """
+    filters = filters or {}
+    mask = joke_index.query(category=category, **filters)
+    if category not in hot_categories or joke_index.count(mask) < RELEVANT_CANDIDATES:
+        fetch_jokes(category, RELEVANT_CANDIDATES, filters)
+        mask = joke_index.query(category=category, **filters)
+    if session is not None and mask & ~session.seen:
+        mask &= ~session.seen
+    jokes = joke_index.rank(keywords, mask, amount)
+    if len(jokes) < amount:
+        remaining = mask & ~joke_index.mask_for_ids(joke['id'] for joke in jokes)
+        jokes.extend(joke_index.sample(remaining, amount - len(jokes)))
+    mark_delivered(session, jokes)
+    return jokes
+
+def get_session(x_session_id: Optional[str] = Header(None, max_length=128)) -> Optional[Session]:
+    """Session named by the optional X-Session-Id header, for no-repeat delivery."""
+    return session_store.get(x_session_id) if x_session_id else None
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to AI-Powered Joke Search API"}
 
 @app.post("/api/ask")
-async def ask_for_joke(joke_request: JokeRequest, amount: int = Query(1, ge=1, le=10)):
+async def ask_for_joke(
+    joke_request: JokeRequest,
+    amount: int = Query(1, ge=1, le=10),
+    mode: str = Query("random", pattern="^(random|relevant)$"),
+    filters: Dict[str, Any] = Depends(joke_filters),
+    session: Optional[Session] = Depends(get_session)
+):
     """Handle natural language requests for jokes using AI analysis."""
     try:
         # Use LLM to analyze the request
         ai_analysis = await llm_service.analyze_request(joke_request.request)
-        
+    except LimitExceeded:
+        # The LLM is saturated: answer from keyword matching straight away
+        return legacy_joke_response(joke_request.request, amount, filters, session, "LLM at capacity - used legacy keyword matching")
+    except Exception as e:
+        print(f"LLM error, falling back to legacy method: {e}")
+        return legacy_joke_response(joke_request.request, amount, filters, session)
+    
+    try:
         # Use AI-suggested category and amount, but respect user's amount parameter
         category = ai_analysis.get('category', 'Any')
         suggested_amount = min(ai_analysis.get('suggested_amount', 3), amount)
+        hot_requests.record(normalize_request(joke_request.request), category)
         
-        # Fetch jokes from the API
-        response = requests.get(f"https://v2.jokeapi.dev/joke/{category}?amount={suggested_amount}")
-        response.raise_for_status()
-        joke_data = response.json()
-        
-        if joke_data.get('error'):
-            raise HTTPException(status_code=400, detail=joke_data.get('message', 'Error fetching joke'))
-        
-        # Handle both single joke and multiple jokes response
-        jokes = joke_data.get('jokes', [joke_data])
-        
-        formatted_jokes = []
-        for joke in jokes:
-            if joke.get('type') == 'twopart':
-                formatted_jokes.append({
-                    "category": joke['category'],
-                    "setup": joke['setup'],
-                    "delivery": joke['delivery'],
-                    "is_safe": joke['safe']
-                })
-            else:
-                formatted_jokes.append({
-                    "category": joke['category'],
-                    "joke": joke['joke'],
-                    "is_safe": joke['safe']
-                })
+        # Fetch jokes from the local index or the API
+        if mode == "relevant":
+            jokes = select_relevant_jokes(category, suggested_amount, ai_analysis.get('keywords', []), filters, session)
+        else:
+            jokes = select_jokes(category, suggested_amount, filters, session)
+        formatted_jokes = format_jokes(jokes)
         
         # Generate contextual response using LLM
-        context_response = await llm_service.generate_response_context(joke_request.request, formatted_jokes)
+        try:
+            context_response = await llm_service.generate_response_context(joke_request.request, formatted_jokes)
+        except LimitExceeded:
+            context_response = f"Here are some {category} jokes for you!"
         
         return {
             "jokes": formatted_jokes,
@@ -133,54 +500,46 @@ async def ask_for_joke(joke_request: JokeRequest, amount: int = Query(1, ge=1, l
             "ai_analysis": ai_analysis,
             "context_response": context_response
         }
-    except requests.RequestException as e:
+    except UpstreamError as e:
         raise HTTPException(status_code=500, detail="Error fetching joke")
+    except LimitExceeded:
+        raise
     except Exception as e:
         # Fallback to legacy method if LLM fails
         print(f"LLM error, falling back to legacy method: {e}")
-        try:
-            category = extract_category(joke_request.request)
-            response = requests.get(f"https://v2.jokeapi.dev/joke/{category}?amount={amount}")
-            response.raise_for_status()
-            joke_data = response.json()
-            
-            if joke_data.get('error'):
-                raise HTTPException(status_code=400, detail=joke_data.get('message', 'Error fetching joke'))
-            
-            jokes = joke_data.get('jokes', [joke_data])
-            
-            formatted_jokes = []
-            for joke in jokes:
-                if joke.get('type') == 'twopart':
-                    formatted_jokes.append({
-                        "category": joke['category'],
-                        "setup": joke['setup'],
-                        "delivery": joke['delivery'],
-                        "is_safe": joke['safe']
-                    })
-                else:
-                    formatted_jokes.append({
-                        "category": joke['category'],
-                        "joke": joke['joke'],
-                        "is_safe": joke['safe']
-                    })
-            
-            return {
-                "jokes": formatted_jokes,
-                "total": len(formatted_jokes),
-                "page": 1,
-                "has_more": False,
-                "ai_analysis": {
-                    "category": category,
-                    "keywords": [],
-                    "reasoning": "Fallback to legacy keyword matching",
-                    "user_mood": "unknown",
-                    "suggested_amount": amount
-                },
-                "context_response": f"Here are some {category} jokes for you!"
-            }
-        except Exception as fallback_error:
-            raise HTTPException(status_code=500, detail="Error fetching joke")
+        return legacy_joke_response(joke_request.request, amount, filters, session)
+
+def legacy_joke_response(
+    user_request: str,
+    amount: int,
+    filters: Optional[Dict[str, Any]],
+    session: Optional[Session] = None,
+    reasoning: str = "Fallback to legacy keyword matching"
+) -> Dict[str, Any]:
+    """Answer an /api/ask request with keyword category matching and no LLM calls."""
+    try:
+        category = extract_category(user_request)
+        jokes = select_jokes(category, amount, filters, session)
+        formatted_jokes = format_jokes(jokes)
+        
+        return {
+            "jokes": formatted_jokes,
+            "total": len(formatted_jokes),
+            "page": 1,
+            "has_more": False,
+            "ai_analysis": {
+                "category": category,
+                "keywords": [],
+                "reasoning": reasoning,
+                "user_mood": "unknown",
+                "suggested_amount": amount
+            },
+            "context_response": f"Here are some {category} jokes for you!"
+        }
+    except LimitExceeded:
+        raise
+    except Exception as fallback_error:
+        raise HTTPException(status_code=500, detail="Error fetching joke")
 
 @app.post("/api/analyze")
 async def analyze_request(joke_request: JokeRequest) -> AIAnalysisResponse:
@@ -188,6 +547,8 @@ async def analyze_request(joke_request: JokeRequest) -> AIAnalysisResponse:
     try:
         analysis = await llm_service.analyze_request(joke_request.request)
         return AIAnalysisResponse(**analysis)
+    except LimitExceeded as e:
+        return overloaded_response(e)
     except Exception as e:
         # Fallback analysis
         fallback = llm_service._fallback_analysis(joke_request.request)
@@ -195,11 +556,12 @@ async def analyze_request(joke_request: JokeRequest) -> AIAnalysisResponse:
 
 @app.get("/api/joke/{joke_id}", response_model=JokeResponse)
 async def get_joke(joke_id: int):
+    joke = joke_index.get(joke_id)
+    if joke is not None:
+        return {"error": False, **joke}
     try:
-        response = requests.get(f"https://v2.jokeapi.dev/joke/Any?idRange={joke_id}")
-        response.raise_for_status()
-        return response.json()
-    except requests.RequestException as e:
+        return jokeapi_get("/joke/Any", {"idRange": joke_id})
+    except UpstreamError as e:
         raise HTTPException(status_code=404, detail="Joke not found")
 
 @app.get("/api/search")
@@ -207,58 +569,178 @@ async def search_joke(
     query: str,
     category: Optional[str] = None,
     page: int = Query(1, ge=1),
-    amount: int = Query(5, ge=1, le=10)
+    amount: int = Query(5, ge=1, le=10),
+    filters: Dict[str, Any] = Depends(joke_filters),
+    session: Optional[Session] = Depends(get_session)
 ):
     try:
-        # Build the URL with parameters
-        base_url = "https://v2.jokeapi.dev/joke/"
         category = category or "Any"
-        url = f"{base_url}{category}?contains={query}&amount={amount}"
-        
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
         
-        if data.get('error'):
-            raise HTTPException(status_code=400, detail=data.get('message', 'Error searching for joke'))
+        # Filtered searches are paged straight out of the local index when it has enough matches.
+        # A session only ever sees unseen jokes, so its "next page" is simply the first unseen ones.
+        if has_filters(filters):
+            mask = joke_index.query(category=category, contains=query, **filters)
+            offset = (page - 1) * amount
+            if session is not None:
+                mask &= ~session.seen
+                offset = 0
+            matches = joke_index.count(mask)
+            if matches >= offset + amount:
+                jokes = joke_index.jokes(mask)[offset:offset + amount]
+                mark_delivered(session, jokes)
+                return {
+                    "jokes": format_jokes(jokes),
+                    "total": len(jokes),
+                    "page": page,
+                    "has_more": matches > offset + amount
+                }
         
-        # Handle both single joke and multiple jokes response
-        jokes = data.get('jokes', [data])
-        
-        formatted_jokes = []
-        for joke in jokes:
-            if joke.get('type') == 'twopart':
-                formatted_jokes.append({
-                    "category": joke['category'],
-                    "setup": joke['setup'],
-                    "delivery": joke['delivery'],
-                    "is_safe": joke['safe']
-                })
-            else:
-                formatted_jokes.append({
-                    "category": joke['category'],
-                    "joke": joke['joke'],
-                    "is_safe": joke['safe']
-                })
+        fetched = fetch_jokes(category, amount, filters, contains=query, error_detail="Error searching for joke")
+        jokes = drop_seen(fetched, session)
+        mark_delivered(session, jokes)
+        formatted_jokes = format_jokes(jokes)
         
         return {
             "jokes": formatted_jokes,
             "total": len(formatted_jokes),
             "page": page,
-            "has_more": len(formatted_jokes) == amount
+            "has_more": len(fetched) == amount
         }
-    except requests.RequestException as e:
+    except UpstreamError as e:
         raise HTTPException(status_code=500, detail="Error searching for joke")
 
 @app.get("/api/categories")
 async def get_categories():
     try:
-        response = requests.get("https://v2.jokeapi.dev/categories")
-        response.raise_for_status()
-        return response.json()
-    except requests.RequestException as e:
+        return jokeapi_get("/categories")
+    except UpstreamError as e:
         raise HTTPException(status_code=500, detail="Error fetching categories")
 
+@app.websocket("/ws/jokes")
+async def joke_feed_socket(websocket: WebSocket):
+    """
+    Push jokes to a subscriber at its chosen rate.
+
+    The first client message subscribes, e.g.
+    {"request": "programming jokes please", "interval": 10, "amount": 1, "safe": true}
+    or {"category": "Pun", ...}; `type`, `lang` and `blacklist_flags` filters are
+    accepted as in /api/search. The request is analyzed once, then jokes are sent
+    every `interval` seconds until the client disconnects. If the client reads
+    slower than that, ticks are skipped instead of queueing without bound.
+    """
+    await websocket.accept()
+    try:
+        subscription = await websocket.receive_json()
+        for field in ("request", "category"):
+            if subscription.get(field) is not None and not isinstance(subscription[field], str):
+                raise HTTPException(status_code=400, detail=f"{field} must be a string")
+        # Called directly, joke_filters doesn't get the Query pattern check
+        if subscription.get("type") not in (None,) + JOKE_TYPES:
+            raise HTTPException(status_code=400, detail=f"Unknown joke type: {subscription.get('type')}")
+        filters = joke_filters(
+            safe=subscription.get("safe"),
+            joke_type=subscription.get("type"),
+            lang=subscription.get("lang"),
+            blacklist_flags=subscription.get("blacklist_flags")
+        )
+        interval = max(WS_MIN_INTERVAL, float(subscription.get("interval", 10)))
+        amount = min(max(int(subscription.get("amount", 1)), 1), 10)
+    except WebSocketDisconnect:
+        return
+    except (HTTPException, ValueError, TypeError, AttributeError) as e:
+        await websocket.send_json({"type": "error", "detail": getattr(e, "detail", "Invalid subscription")})
+        await websocket.close(code=1008)
+        return
+
+    ai_analysis = None
+    category = subscription.get("category") or "Any"
+    if subscription.get("request"):
+        try:
+            ai_analysis = await llm_service.analyze_request(subscription["request"])
+        except LimitExceeded:
+            ai_analysis = llm_service._fallback_analysis(subscription["request"])
+        category = subscription.get("category") or ai_analysis.get("category", "Any")
+    await websocket.send_json({"type": "subscribed", "category": category, "interval": interval, "ai_analysis": ai_analysis})
+
+    session = Session()
+    outbox: asyncio.Queue = asyncio.Queue(maxsize=WS_SEND_QUEUE)
+
+    async def produce():
+        skipped = 0
+        while True:
+            if outbox.full():
+                # Slow reader: skip this tick rather than buffer more
+                skipped += 1
+            else:
+                jokes = await joke_feed.draw(category, amount, filters, session)
+                if jokes:
+                    outbox.put_nowait({"type": "jokes", "jokes": format_jokes(jokes), "skipped": skipped})
+            await asyncio.sleep(interval)
+
+    async def deliver():
+        while True:
+            await websocket.send_json(await outbox.get())
+
+    async def watch_disconnect():
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+
+    tasks = [asyncio.ensure_future(task()) for task in (produce, deliver, watch_disconnect)]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if task.exception() and not isinstance(task.exception(), WebSocketDisconnect):
+                print(f"Joke feed connection error: {task.exception()}")
+    finally:
+        for task in tasks:
+            task.cancel()
+
+@app.post("/api/admin/profile/cpu", response_class=PlainTextResponse, dependencies=[Depends(require_admin)])
+async def profile_cpu(
+    seconds: float = Query(10, gt=0, le=60),
+    mode: str = Query("sampling", pattern="^(sampling|cprofile)$"),
+    interval_ms: float = Query(5, ge=1, le=100)
+):
+    """Profile live traffic for `seconds`; returns collapsed stacks or pstats text."""
+    try:
+        if mode == "cprofile":
+            return await profiling.profile_cpu_cprofile(seconds)
+        return await profiling.profile_cpu_sampling(seconds, interval_ms / 1000)
+    except profiling.CaptureInProgress:
+        raise HTTPException(status_code=409, detail="A profile capture is already running")
+
+@app.post("/api/admin/profile/memory", dependencies=[Depends(require_admin)])
+async def profile_memory(
+    seconds: float = Query(10, gt=0, le=60),
+    limit: int = Query(25, ge=1, le=200)
+):
+    """Diff two tracemalloc snapshots taken `seconds` apart."""
+    try:
+        return {"seconds": seconds, "top": await profiling.memory_snapshot_diff(seconds, limit)}
+    except profiling.CaptureInProgress:
+        raise HTTPException(status_code=409, detail="A profile capture is already running")
+
+@app.get("/api/admin/limits", dependencies=[Depends(require_admin)])
+async def get_limits():
+    """Current adaptive concurrency limits, shed counts and session store usage."""
+    return {
+        "llm": llm_limiter.stats(),
+        "jokeapi": upstream_limiter.stats(),
+        "sessions": session_store.stats()
+    }
+
+@app.get("/api/admin/hot-requests", dependencies=[Depends(require_admin)])
+async def get_hot_requests():
+    """Current top-K /api/ask requests with their estimated recent counts."""
+    return {"refresh_interval": HOT_REFRESH_INTERVAL, "top": hot_requests.top()}
+
+@app.get("/api/admin/http-cache", dependencies=[Depends(require_admin)])
+async def get_http_cache_stats():
+    """304 and compression counters, including bytes saved."""
+    return http_cache_stats.to_dict()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
@@ -0,0 +1,116 @@
+import asyncio
+import cProfile
+import io
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Dict, Any, List
+
+# Only one capture may run at a time; nothing is installed while idle
+_capture_lock = threading.Lock()
+
+
+class CaptureInProgress(Exception):
+    """Raised when a profile is requested while another capture is running."""
+
+
+def _collapse(frame) -> str:
+    """Render a frame's stack root-first as `file:function;file:function`."""
+    parts = []
+    while frame is not None:
+        code = frame.f_code
+        parts.append(f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(parts))
+
+
+def sample_stacks(seconds: float, interval: float = 0.005) -> Counter:
+    """
+    Sample every thread's stack for `seconds`, blocking the calling thread.
+
+    Returns:
+        Counter of collapsed stacks to the number of samples they appeared in
+    """
+    own_thread = threading.get_ident()
+    stacks: Counter = Counter()
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id != own_thread:
+                stacks[_collapse(frame)] += 1
+        time.sleep(interval)
+    return stacks
+
+
+def format_collapsed(stacks: Counter) -> str:
+    """Collapsed-stack text as consumed by flamegraph.pl and speedscope."""
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+async def profile_cpu_sampling(seconds: float, interval: float = 0.005) -> str:
+    """Sample live traffic from a worker thread and return collapsed stacks."""
+    if not _capture_lock.acquire(blocking=False):
+        raise CaptureInProgress()
+    try:
+        loop = asyncio.get_running_loop()
+        stacks = await loop.run_in_executor(None, sample_stacks, seconds, interval)
+        return format_collapsed(stacks)
+    finally:
+        _capture_lock.release()
+
+
+async def profile_cpu_cprofile(seconds: float, limit: int = 50) -> str:
+    """
+    Deterministically profile the event loop thread for `seconds`.
+
+    cProfile hooks the thread it is enabled on, so enabling it from a coroutine
+    captures every request handled by this loop until it is disabled again.
+    """
+    if not _capture_lock.acquire(blocking=False):
+        raise CaptureInProgress()
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+        await asyncio.sleep(seconds)
+    finally:
+        profiler.disable()
+        _capture_lock.release()
+
+    output = io.StringIO()
+    pstats.Stats(profiler, stream=output).sort_stats("cumulative").print_stats(limit)
+    return output.getvalue()
+
+
+async def memory_snapshot_diff(seconds: float, limit: int = 25, frames: int = 1) -> List[Dict[str, Any]]:
+    """
+    Trace allocations for `seconds` and return the largest growth by source line.
+
+    tracemalloc is only running for the duration of the capture unless it was
+    already enabled (e.g. via PYTHONTRACEMALLOC), in which case it is left on.
+    """
+    if not _capture_lock.acquire(blocking=False):
+        raise CaptureInProgress()
+    was_tracing = tracemalloc.is_tracing()
+    try:
+        if not was_tracing:
+            tracemalloc.start(frames)
+        before = tracemalloc.take_snapshot()
+        await asyncio.sleep(seconds)
+        after = tracemalloc.take_snapshot()
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+        _capture_lock.release()
+
+    return [
+        {
+            "location": str(stat.traceback),
+            "size_diff": stat.size_diff,
+            "count_diff": stat.count_diff,
+            "size": stat.size,
+        }
+        for stat in after.compare_to(before, "lineno")[:limit]
+    ]
@@ -0,0 +1,70 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+
+class Session:
+    """Jokes already delivered to one client, as a bitset over JokeIndex slots."""
+
+    __slots__ = ("seen", "last_access")
+
+    def __init__(self):
+        self.seen = 0
+        self.last_access = time.monotonic()
+
+    def mark_seen(self, mask: int):
+        self.seen |= mask
+
+
+class SessionStore:
+    """
+    Bounded set of sessions with idle eviction.
+
+    A session's bitmap can never exceed the index's slot count, so memory per
+    session is fixed by `JokeIndex.max_jokes` (5000 slots = 625 bytes). Sessions
+    are kept in access order: idle ones are dropped from the front on every
+    lookup, and the least recently used one makes room when `max_sessions` is hit.
+    """
+
+    def __init__(self, max_sessions: int = 10000, idle_ttl: float = 1800.0):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.evicted = 0
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get(self, session_id: str) -> Session:
+        """Return the session for `session_id`, creating it if needed."""
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle(now)
+            session = self._sessions.get(session_id)
+            if session is None:
+                if len(self._sessions) >= self.max_sessions:
+                    self._sessions.popitem(last=False)
+                    self.evicted += 1
+                session = self._sessions[session_id] = Session()
+            else:
+                self._sessions.move_to_end(session_id)
+            session.last_access = now
+            return session
+
+    def _evict_idle(self, now: float):
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if now - session.last_access < self.idle_ttl:
+                break
+            del self._sessions[session_id]
+            self.evicted += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sessions": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "idle_ttl": self.idle_ttl,
+            "evicted": self.evicted,
+        }
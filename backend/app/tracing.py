@@ -0,0 +1,191 @@
+import json
+import os
+import queue
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, Optional, List
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+
+class Trace:
+    """Spans recorded for one request."""
+
+    def __init__(self, name: str, attributes: Optional[Dict[str, Any]] = None):
+        self.trace_id = uuid.uuid4().hex
+        self.name = name
+        self.attributes = attributes or {}
+        self.start = time.time()
+        self.start_perf = time.perf_counter()
+        self.duration_ms = 0.0
+        self.spans: List[Dict[str, Any]] = []
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "spans": self.spans,
+        }
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Optional[str]] = ContextVar("current_span", default=None)
+
+
+class JsonlTraceExporter:
+    """
+    Writes finished traces to a size-rotated JSONL file from a background thread.
+
+    `export` only does a non-blocking put on a bounded queue; when the writer
+    falls behind, traces are dropped and counted rather than stalling requests.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 10 * 1024 * 1024, backups: int = 5, queue_size: int = 10000):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.dropped = 0
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, trace: Dict[str, Any]):
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self, timeout: float = 5.0):
+        """Flush pending traces and stop the writer thread."""
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def _run(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        stream = open(self.path, "a", encoding="utf-8")
+        try:
+            while True:
+                trace = self._queue.get()
+                if trace is None:
+                    break
+                stream.write(json.dumps(trace, default=str) + "\n")
+                # Only flush once the queue is drained so bursts share a write
+                if self._queue.empty():
+                    stream.flush()
+                if stream.tell() >= self.max_bytes:
+                    stream.close()
+                    self._rotate()
+                    stream = open(self.path, "a", encoding="utf-8")
+        finally:
+            stream.close()
+
+    def _rotate(self):
+        for i in range(self.backups - 1, 0, -1):
+            source = f"{self.path}.{i}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{i + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+
+class Tracer:
+    """
+    Request tracing with tail-based sampling.
+
+    Spans are always recorded while a trace is open; the keep/drop decision is
+    made when the trace finishes, so every trace slower than `slow_ms` is kept
+    regardless of `sample_rate`. Without an exporter tracing is a no-op.
+    """
+
+    def __init__(self, exporter: Optional[JsonlTraceExporter] = None, sample_rate: float = 0.01, slow_ms: float = 1000.0):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    @contextmanager
+    def trace(self, name: str, **attributes):
+        """Open a trace for the current request; yields the Trace (or None when disabled)."""
+        if not self.enabled:
+            yield None
+            return
+
+        trace = Trace(name, attributes)
+        trace_token = _current_trace.set(trace)
+        span_token = _current_span.set(None)
+        try:
+            yield trace
+        finally:
+            _current_span.reset(span_token)
+            _current_trace.reset(trace_token)
+            trace.duration_ms = (time.perf_counter() - trace.start_perf) * 1000
+            if trace.duration_ms >= self.slow_ms or random.random() < self.sample_rate:
+                self.exporter.export(trace.to_dict())
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """Record a span inside the current trace; a no-op outside of one."""
+        trace = _current_trace.get()
+        if trace is None:
+            yield None
+            return
+
+        span = {
+            "span_id": uuid.uuid4().hex[:16],
+            "parent_id": _current_span.get(),
+            "name": name,
+            "offset_ms": round((time.perf_counter() - trace.start_perf) * 1000, 3),
+            "attributes": attributes,
+        }
+        token = _current_span.set(span["span_id"])
+        start = time.perf_counter()
+        try:
+            yield span
+        except Exception as e:
+            span["error"] = repr(e)
+            raise
+        finally:
+            span["duration_ms"] = round((time.perf_counter() - start) * 1000, 3)
+            _current_span.reset(token)
+            trace.spans.append(span)
+
+
+def current_trace_id() -> Optional[str]:
+    trace = _current_trace.get()
+    return trace.trace_id if trace else None
+
+
+def create_tracer() -> Tracer:
+    """Build the tracer from TRACE_* environment variables; disabled unless TRACE_FILE is set."""
+    path = os.getenv("TRACE_FILE")
+    exporter = None
+    if path:
+        exporter = JsonlTraceExporter(
+            path,
+            max_bytes=int(os.getenv("TRACE_FILE_MAX_BYTES", str(10 * 1024 * 1024))),
+            backups=int(os.getenv("TRACE_FILE_BACKUPS", "5")),
+        )
+    return Tracer(
+        exporter,
+        sample_rate=float(os.getenv("TRACE_SAMPLE_RATE", "0.01")),
+        slow_ms=float(os.getenv("TRACE_SLOW_MS", "1000")),
+    )
+
+
+tracer = create_tracer()
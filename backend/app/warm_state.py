@@ -0,0 +1,71 @@
+import json
+import mmap
+import os
+import time
+import zlib
+from typing import Dict, Any
+
+from app.cache import TTLCache
+from app.joke_index import JokeIndex
+
+SNAPSHOT_VERSION = 1
+
+
+def save_snapshot(path: str, joke_index: JokeIndex, analysis_cache: TTLCache) -> int:
+    """
+    Persist warm state as zlib-compressed compact JSON.
+
+    The file is written next to its destination and renamed into place, so a
+    worker booting concurrently never maps a half-written snapshot.
+
+    Returns:
+        Size of the snapshot in bytes
+    """
+    state = {
+        "version": SNAPSHOT_VERSION,
+        "saved_at": time.time(),
+        "jokes": joke_index.export(),
+        "analysis_cache": analysis_cache.export(),
+    }
+    payload = zlib.compress(json.dumps(state, separators=(",", ":")).encode("utf-8"), 6)
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as stream:
+        stream.write(payload)
+    os.replace(tmp_path, path)
+    return len(payload)
+
+
+def load_snapshot(path: str, joke_index: JokeIndex, analysis_cache: TTLCache) -> Dict[str, Any]:
+    """
+    Restore warm state written by `save_snapshot`.
+
+    The file is memory-mapped and decompressed straight from the mapping, so
+    workers on one host share the page-cache copy instead of each reading it
+    into their own buffer first.
+
+    Returns:
+        Counts of restored jokes and cache entries (empty if no usable snapshot)
+    """
+    try:
+        with open(path, "rb") as stream:
+            if os.fstat(stream.fileno()).st_size == 0:
+                return {}
+            with mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                state = json.loads(zlib.decompress(mapped))
+    except FileNotFoundError:
+        return {}
+    except (OSError, zlib.error, ValueError) as e:
+        print(f"Ignoring unreadable warm-state snapshot {path}: {e}")
+        return {}
+
+    if state.get("version") != SNAPSHOT_VERSION:
+        return {}
+    return {
+        "jokes": joke_index.add_jokes(state.get("jokes", [])),
+        "analysis_cache": analysis_cache.load([tuple(entry) for entry in state.get("analysis_cache", [])]),
+        "age_seconds": round(time.time() - state.get("saved_at", time.time()), 1),
+    }
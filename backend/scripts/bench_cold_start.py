@@ -0,0 +1,106 @@
+"""
+Cold-start benchmark for the backend.
+
+Boots fresh worker processes with and without a warm-state snapshot and reports
+how long each takes to import the app, run startup, and serve its first
+filtered /api/search request. No network access is
+needed: the snapshot is synthetic, and a cold worker's index misses are
+reported as upstream calls rather than timed against JokeAPI.
+
+Usage:
+    python scripts/bench_cold_start.py [--jokes 1300] [--analyses 500]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORKER = r'''
+import json, time
+start = time.perf_counter()
+from fastapi.testclient import TestClient
+import app.main as main
+imported = time.perf_counter()
+
+upstream_calls = []
+def count_upstream(path, params=None):
+    upstream_calls.append(path)
+    raise main.UpstreamError("benchmark: no network")
+main.jokeapi_get = count_upstream
+
+with TestClient(main.app) as client:
+    started = time.perf_counter()
+    t0 = time.perf_counter()
+    search = client.get("/api/search", params={"query": "joke", "category": "Programming", "safe": "true", "amount": 10})
+    search_ms = (time.perf_counter() - t0) * 1000
+    print(json.dumps({
+        "import_ms": (imported - start) * 1000,
+        "startup_ms": (started - imported) * 1000,
+        "first_search_ms": search_ms,
+        "first_search_status": search.status_code,
+        "indexed_jokes": len(main.joke_index),
+        "cached_analyses": len(main.llm_service.analysis_cache),
+        "upstream_calls": len(upstream_calls),
+        "openai_imported": "openai" in __import__("sys").modules,
+        "requests_imported": "requests" in __import__("sys").modules,
+    }))
+'''
+
+
+def build_snapshot(path: str, jokes: int, analyses: int):
+    sys.path.insert(0, BACKEND_DIR)
+    from app.cache import TTLCache
+    from app.joke_index import JokeIndex
+    from app.warm_state import save_snapshot
+
+    index = JokeIndex()
+    index.add_jokes([
+        {"id": i, "category": "Programming", "type": "single", "lang": "en", "safe": True,
+         "joke": f"Benchmark joke number {i}", "flags": {}}
+        for i in range(jokes)
+    ])
+    cache = TTLCache(max_size=analyses)
+    for i in range(analyses):
+        cache.set(f"request {i}", {"category": "Programming", "keywords": ["bench"], "reasoning": "",
+                                   "user_mood": "neutral", "suggested_amount": 3})
+    return save_snapshot(path, index, cache)
+
+
+def run_worker(env) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", WORKER], cwd=BACKEND_DIR, env=env,
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jokes", type=int, default=1300)
+    parser.add_argument("--analyses", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot = os.path.join(tmp, "warm_state.bin")
+        size = build_snapshot(snapshot, args.jokes, args.analyses)
+
+        base_env = {k: v for k, v in os.environ.items() if k != "WARM_STATE_PATH"}
+        cold = run_worker(base_env)
+        warm = run_worker(dict(base_env, WARM_STATE_PATH=snapshot))
+
+    print(f"snapshot: {args.jokes} jokes, {args.analyses} analyses, {size} bytes")
+    print(f"{'':22}{'cold':>12}{'warm':>12}")
+    for key in ("import_ms", "startup_ms", "first_search_ms", "first_search_status",
+                "indexed_jokes", "cached_analyses", "upstream_calls", "openai_imported", "requests_imported"):
+        cold_value, warm_value = cold[key], warm[key]
+        if isinstance(cold_value, float):
+            cold_value, warm_value = f"{cold_value:.1f}", f"{warm_value:.1f}"
+        print(f"{key:22}{str(cold_value):>12}{str(warm_value):>12}")
+
+
+if __name__ == "__main__":
+    main()
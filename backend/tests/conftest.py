@@ -0,0 +1,23 @@
+from types import SimpleNamespace
+
+import pytest
+
+
+@pytest.fixture
+def stub_openai(monkeypatch):
+    """
+    Point an LLMService at a stub OpenAI client.
+
+    Returns `stub(service, reply)`: every chat completion answers with `reply`,
+    or with what `reply(**kwargs)` returns (it may also raise) when callable.
+    """
+    def stub(service, reply):
+        def create(**kwargs):
+            content = reply(**kwargs) if callable(reply) else reply
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+        client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+        monkeypatch.setattr(service, "_client", client)
+        monkeypatch.setattr(service, "_client_initialized", True)
+
+    return stub
@@ -0,0 +1,107 @@
+import asyncio
+import json
+
+import pytest
+from app.analysis_batcher import AnalysisBatcher
+from app.llm_service import LLMService
+from app.tracing import Tracer, JsonlTraceExporter
+
+
+class TestAnalysisBatcher:
+    """Test cases for micro-batching of request analyses."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_share_one_batch(self):
+        calls = []
+
+        def analyze_many(user_requests):
+            calls.append(list(user_requests))
+            return [{"request": request} for request in user_requests]
+
+        batcher = AnalysisBatcher(analyze_many, lambda request: {}, window_ms=20)
+        results = await asyncio.gather(*(batcher.submit(f"req {i}") for i in range(3)))
+
+        assert calls == [["req 0", "req 1", "req 2"]]
+        assert [result["request"] for result in results] == ["req 0", "req 1", "req 2"]
+
+    @pytest.mark.asyncio
+    async def test_full_batch_flushes_early(self):
+        calls = []
+
+        def analyze_many(user_requests):
+            calls.append(len(user_requests))
+            return [{} for _ in user_requests]
+
+        batcher = AnalysisBatcher(analyze_many, lambda request: {}, window_ms=10000, max_batch_size=2)
+        await asyncio.wait_for(asyncio.gather(batcher.submit("a"), batcher.submit("b")), timeout=1)
+        assert calls == [2]
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_uses_fallback(self):
+        def analyze_many(user_requests):
+            raise RuntimeError("upstream down")
+
+        batcher = AnalysisBatcher(analyze_many, lambda request: {"fallback": request}, window_ms=1)
+        assert await batcher.submit("x") == {"fallback": "x"}
+
+
+class TestBatchAnalysis:
+    """Test cases for LLMService's multi-item analysis prompt."""
+
+    def setup_method(self):
+        self.llm_service = LLMService()
+
+    def test_per_item_fallback(self, stub_openai):
+        items = [
+            {"id": 1, "category": "Pun", "keywords": ["words"], "reasoning": "r",
+             "user_mood": "happy", "suggested_amount": 2},
+            {"id": 0, "category": "Dark"},
+        ]
+        stub_openai(self.llm_service, "Here you go: " + json.dumps(items))
+
+        results = self.llm_service._analyze_batch(["I want programming jokes", "Some wordplay please"])
+
+        assert results[1]["category"] == "Pun"
+        assert "id" not in results[1]
+        assert results[0] == dict(self.llm_service._fallback_analysis("I want programming jokes"), _fallback=True)
+
+    def test_unparseable_response(self):
+        assert self.llm_service._parse_batch_analysis("no json here", 2) == {}
+        assert self.llm_service._parse_batch_analysis("[not json]", 2) == {}
+
+    def test_corrupt_item_keeps_the_others(self):
+        good = {"category": "Pun", "keywords": ["words"], "reasoning": "r",
+                "user_mood": "happy", "suggested_amount": 2}
+        content = (
+            '[' + json.dumps(dict(good, id=0)) + ', {"id": 1, "category": "Dark",}, '
+            + json.dumps(dict(good, id=2, category="Misc")) + ', {"id": 3, "category": "Sp'
+        )
+
+        results = self.llm_service._parse_batch_analysis(content, 4)
+
+        assert sorted(results) == [0, 2]
+        assert results[0]["category"] == "Pun"
+        assert results[2]["category"] == "Misc"
+
+
+@pytest.mark.asyncio
+async def test_batched_analysis_spans_are_traced(tmp_path, monkeypatch, stub_openai):
+    import app.llm_service as llm_module
+    exporter = JsonlTraceExporter(str(tmp_path / "traces.jsonl"))
+    test_tracer = Tracer(exporter, sample_rate=1.0)
+    monkeypatch.setattr(llm_module, "tracer", test_tracer)
+
+    llm_service = LLMService()
+    llm_service.batcher.window_ms = 1
+    analysis = {"category": "Pun", "keywords": [], "reasoning": "r", "user_mood": "happy", "suggested_amount": 1}
+    stub_openai(llm_service, json.dumps(analysis))
+
+    with test_tracer.trace("POST /api/ask"):
+        await llm_service.analyze_request("a pun please")
+    exporter.close()
+
+    with open(tmp_path / "traces.jsonl") as stream:
+        [exported] = [json.loads(line) for line in stream]
+    names = [span["name"] for span in exported["spans"]]
+    assert "openai chat.completions" in names
+    assert "parse_analysis_json" in names
@@ -0,0 +1,41 @@
+import pytest
+from app.concurrency import AdaptiveLimiter, LimitExceeded
+
+
+class TestAdaptiveLimiter:
+    """Test cases for the AIMD concurrency limiter."""
+
+    def test_sheds_over_limit(self):
+        limiter = AdaptiveLimiter("test", initial_limit=2)
+        assert limiter.try_acquire() and limiter.try_acquire()
+        assert not limiter.try_acquire()
+        assert limiter.shed == 1
+        with pytest.raises(LimitExceeded):
+            with limiter.slot():
+                pass
+
+    def test_additive_increase(self):
+        limiter = AdaptiveLimiter("test", initial_limit=4, latency_target=1.0)
+        # +1/limit per success: about one limit's worth of calls to grow by one
+        for _ in range(5):
+            with limiter.slot():
+                pass
+        assert limiter.limit == 5
+        assert limiter.in_flight == 0
+
+    def test_multiplicative_decrease_once_per_window(self):
+        limiter = AdaptiveLimiter("test", initial_limit=16, latency_target=10.0)
+        for _ in range(3):
+            limiter.try_acquire()
+        for _ in range(3):
+            limiter.release(latency=20.0)
+        assert limiter.limit == 8
+        assert limiter.decreases == 1
+
+    def test_failure_backs_off_and_respects_minimum(self):
+        limiter = AdaptiveLimiter("test", initial_limit=1, min_limit=1, latency_target=0)
+        with pytest.raises(ValueError):
+            with limiter.slot():
+                raise ValueError("upstream error")
+        assert limiter.limit == 1
+        assert limiter.decreases == 1
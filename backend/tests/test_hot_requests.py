@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+from app.hot_requests import CountMinSketch, HotRequestTracker
+
+
+class TestCountMinSketch:
+    """Test cases for the count-min sketch."""
+
+    def test_never_undercounts(self):
+        sketch = CountMinSketch(width=64, depth=3)
+        for i in range(200):
+            sketch.add(f"key {i % 50}")
+        assert all(sketch.estimate(f"key {i}") >= 4 for i in range(50))
+
+    def test_halve(self):
+        sketch = CountMinSketch()
+        sketch.add("joke", 10)
+        sketch.halve()
+        assert sketch.estimate("joke") == 5
+
+
+class TestHotRequestTracker:
+    """Test cases for top-K request tracking."""
+
+    def test_keeps_most_frequent(self):
+        tracker = HotRequestTracker(k=2)
+        for _ in range(5):
+            tracker.record("tell me a programming joke", "Programming")
+        for _ in range(3):
+            tracker.record("something spooky", "Spooky")
+        tracker.record("a pun please", "Pun")
+
+        top = tracker.top()
+        assert [entry["request"] for entry in top] == ["tell me a programming joke", "something spooky"]
+        assert top[0]["category"] == "Programming"
+        assert top[0]["estimated_count"] == 5
+
+    def test_newcomer_replaces_minimum(self):
+        tracker = HotRequestTracker(k=2)
+        tracker.record("a", "Any")
+        tracker.record("b", "Any")
+        for _ in range(3):
+            tracker.record("c", "Any")
+        assert {entry["request"] for entry in tracker.top()} >= {"c"}
+        assert len(tracker.top()) == 2
+
+    def test_decay_drops_cold_entries(self):
+        tracker = HotRequestTracker(k=5)
+        tracker.record("once", "Any")
+        for _ in range(4):
+            tracker.record("often", "Any")
+        tracker.decay()
+        assert tracker.top() == [{"request": "often", "category": "Any", "estimated_count": 2}]
+
+
+@pytest.mark.asyncio
+async def test_refresh_prefetches_each_category_once(monkeypatch):
+    import app.main as main
+    tracker = HotRequestTracker(k=5)
+    for request, category, count in [("pun one", "Pun", 3), ("pun two", "Pun", 2), ("dark", "Dark", 1)]:
+        for _ in range(count):
+            tracker.record(request, category)
+    fetched = []
+    monkeypatch.setattr(main, "hot_requests", tracker)
+    monkeypatch.setattr(main, "HOT_REFRESH_INTERVAL", 0.01)
+    monkeypatch.setattr(main, "fetch_jokes", lambda category, amount: fetched.append(category))
+
+    task = asyncio.ensure_future(main.refresh_hot_requests())
+    for _ in range(200):
+        if fetched[1:]:
+            break
+        await asyncio.sleep(0.005)
+    task.cancel()
+
+    assert fetched[:2] == ["Pun", "Dark"]
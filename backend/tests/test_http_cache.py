@@ -0,0 +1,87 @@
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from app.http_cache import HTTPCacheMiddleware, HTTPCacheStats, etag_matches
+
+stats = HTTPCacheStats()
+app = FastAPI()
+app.add_middleware(
+    HTTPCacheMiddleware,
+    policies=[(r"^/static$", "public, max-age=60"), (r"^/missing$", "public, max-age=86400")],
+    min_size=100,
+    stats=stats
+)
+
+
+@app.get("/static")
+async def static():
+    return {"text": "joke " * 100}
+
+
+@app.get("/missing")
+async def missing():
+    raise HTTPException(status_code=404, detail="Joke not found")
+
+
+@app.get("/small")
+async def small():
+    return {"text": "hi"}
+
+
+@app.post("/echo")
+async def echo():
+    return {"text": "joke " * 100}
+
+
+client = TestClient(app)
+
+
+class TestHTTPCacheMiddleware:
+    """Test cases for ETag, Cache-Control and compression handling."""
+
+    def test_etag_and_not_modified(self):
+        first = client.get("/static")
+        etag = first.headers["etag"]
+        assert first.headers["cache-control"] == "public, max-age=60"
+
+        before = stats.not_modified_bytes_saved
+        second = client.get("/static", headers={"If-None-Match": etag})
+        assert second.status_code == 304
+        assert second.content == b""
+        assert second.headers["etag"] == etag
+        assert second.headers["vary"] == first.headers["vary"] == "Accept-Encoding"
+        assert stats.not_modified_bytes_saved > before
+
+    def test_error_responses_not_cached(self):
+        response = client.get("/missing")
+        assert response.status_code == 404
+        assert response.headers["cache-control"] == "no-store"
+        assert "etag" not in response.headers
+
+    def test_gzip_above_threshold(self):
+        response = client.get("/static", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.json()["text"].startswith("joke")
+        assert "Accept-Encoding" in response.headers["vary"]
+
+        raw = client.get("/static", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in raw.headers
+        assert int(raw.headers["content-length"]) == len(raw.content)
+
+    def test_small_responses_untouched(self):
+        response = client.get("/small", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in response.headers
+        assert "cache-control" not in response.headers
+
+    def test_post_compressed_without_etag(self):
+        response = client.post("/echo", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert "etag" not in response.headers
+
+
+def test_etag_matching():
+    etag = 'W/"abc"'
+    assert etag_matches('"abc"', etag)
+    assert etag_matches('W/"xyz", W/"abc"', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"xyz"', etag)
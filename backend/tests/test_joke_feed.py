@@ -0,0 +1,118 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.joke_feed import JokeFeed
+from app.joke_index import JokeIndex
+from app.main import app, joke_index
+from app.sessions import Session
+
+
+def make_jokes(start, count, category="Spooky"):
+    return [
+        {"id": start + i, "category": category, "type": "single", "lang": "en", "safe": True,
+         "joke": f"{category} feed joke {start + i}", "flags": {}}
+        for i in range(count)
+    ]
+
+
+class TestJokeFeed:
+    """Test cases for the shared WebSocket joke source."""
+
+    @pytest.mark.asyncio
+    async def test_no_repeats_until_exhausted(self):
+        index = JokeIndex()
+        index.add_jokes(make_jokes(1, 3))
+        feed = JokeFeed(index, lambda category, amount, filters: [])
+        session = Session()
+
+        drawn = [joke["id"] for _ in range(3) for joke in await feed.draw("Spooky", 1, {}, session)]
+        assert sorted(drawn) == [1, 2, 3]
+        assert len(await feed.draw("Spooky", 1, {}, session)) == 1
+
+    @pytest.mark.asyncio
+    async def test_empty_refill_starts_cooldown(self):
+        index = JokeIndex()
+        index.add_jokes(make_jokes(1, 2))
+        calls = []
+        feed = JokeFeed(index, lambda category, amount, filters: calls.append(category) or [])
+        session = Session()
+
+        for _ in range(6):
+            assert len(await feed.draw("Spooky", 1, {}, session)) == 1
+        assert calls == ["Spooky"]
+
+        feed.refill_cooldown = 0
+        feed._cooldown_until.clear()
+        await feed.draw("Spooky", 1, {}, session)
+        assert calls == ["Spooky", "Spooky"]
+
+    @pytest.mark.asyncio
+    async def test_refill_fetches_into_index(self):
+        index = JokeIndex()
+        calls = []
+
+        def fetch(category, amount, filters):
+            calls.append(category)
+            jokes = make_jokes(100, amount, category)
+            index.add_jokes(jokes)
+            return jokes
+
+        feed = JokeFeed(index, fetch, batch_size=5)
+        jokes = await feed.draw("Pun", 2, {}, Session())
+        assert len(jokes) == 2
+        assert calls == ["Pun"]
+        assert len(index) == 5
+
+
+def test_websocket_subscription_pushes_jokes(monkeypatch):
+    import app.main as main
+    monkeypatch.setattr(main, "WS_MIN_INTERVAL", 0.01)
+    joke_index.add_jokes(make_jokes(9301, 3, "Christmas"))
+
+    client = TestClient(app)
+    with client.websocket_connect("/ws/jokes") as websocket:
+        websocket.send_json({"category": "Christmas", "interval": 0.01, "safe": True})
+        subscribed = websocket.receive_json()
+        assert subscribed["type"] == "subscribed"
+        assert subscribed["category"] == "Christmas"
+
+        texts = {websocket.receive_json()["jokes"][0]["joke"] for _ in range(3)}
+        assert len(texts) == 3
+
+
+@pytest.mark.parametrize("subscription", [
+    {"category": "Any", "blacklist_flags": "boring"},
+    {"category": "Any", "type": "bogus"},
+    {"request": 5},
+    {"category": ["Pun"]},
+])
+def test_websocket_rejects_bad_filters(subscription):
+    client = TestClient(app)
+    with client.websocket_connect("/ws/jokes") as websocket:
+        websocket.send_json(subscription)
+        assert websocket.receive_json()["type"] == "error"
+
+
+@pytest.mark.asyncio
+async def test_concurrent_refills_share_one_fetch():
+    import asyncio
+    import threading
+    index = JokeIndex()
+    calls = []
+    release = threading.Event()
+
+    def fetch(category, amount, filters):
+        calls.append(category)
+        release.wait(1)
+        jokes = make_jokes(200, amount, category)
+        index.add_jokes(jokes)
+        return jokes
+
+    feed = JokeFeed(index, fetch, batch_size=4)
+    draws = [asyncio.ensure_future(feed.draw("Dark", 1, {}, Session())) for _ in range(3)]
+    await asyncio.sleep(0.05)
+    release.set()
+    results = await asyncio.gather(*draws)
+    assert calls == ["Dark"]
+    assert feed.refills == 1
+    assert all(len(jokes) == 1 for jokes in results)
@@ -0,0 +1,100 @@
+from app.joke_index import JokeIndex, iter_bits
+
+
+def make_joke(joke_id, category="Programming", joke_type="twopart", lang="en", safe=True, **flags):
+    joke = {
+        "id": joke_id,
+        "category": category,
+        "type": joke_type,
+        "lang": lang,
+        "safe": safe,
+        "flags": {name: flags.get(name, False) for name in
+                  ("nsfw", "religious", "political", "racist", "sexist", "explicit")},
+    }
+    if joke_type == "twopart":
+        joke["setup"] = f"Setup {joke_id}"
+        joke["delivery"] = f"Delivery {joke_id}"
+    else:
+        joke["joke"] = f"Joke {joke_id}"
+    return joke
+
+
+class TestJokeIndex:
+    """Test cases for the bitset joke index."""
+
+    def setup_method(self):
+        self.index = JokeIndex()
+        self.index.add_jokes([
+            make_joke(1),
+            make_joke(2, joke_type="single"),
+            make_joke(3, category="Pun"),
+            make_joke(4, safe=False, nsfw=True),
+            make_joke(5, lang="de"),
+        ])
+
+    def ids(self, mask):
+        return sorted(joke["id"] for joke in self.index.jokes(mask))
+
+    def test_combined_query(self):
+        mask = self.index.query(category="Programming", joke_type="twopart", lang="en", safe=True)
+        assert self.ids(mask) == [1]
+
+    def test_any_and_multiple_categories(self):
+        assert self.ids(self.index.query(category="Any")) == [1, 2, 3, 4, 5]
+        assert self.ids(self.index.query(category="Pun,Programming", lang="en", safe=True)) == [1, 2, 3]
+
+    def test_blacklist_flags_and_unsafe(self):
+        assert 4 not in self.ids(self.index.query(blacklist_flags=["nsfw"]))
+        assert self.ids(self.index.query(safe=False)) == [4]
+
+    def test_contains(self):
+        assert self.ids(self.index.query(contains="delivery 3")) == [3]
+
+    def test_reindex_existing_joke(self):
+        self.index.add_jokes([make_joke(1, category="Dark")])
+        assert len(self.index) == 5
+        assert self.ids(self.index.query(category="Dark")) == [1]
+        assert 1 not in self.ids(self.index.query(category="Programming"))
+
+    def test_sample_and_lookup(self):
+        mask = self.index.query(category="Programming")
+        assert len(self.index.sample(mask, 2)) == 2
+        assert len(self.index.sample(mask, 50)) == self.index.count(mask)
+        assert self.index.get(3)["category"] == "Pun"
+        assert self.index.get(99) is None
+
+    def test_capacity(self):
+        index = JokeIndex(max_jokes=2)
+        assert index.add_jokes([make_joke(1), make_joke(2), make_joke(3)]) == 2
+        assert len(index) == 2
+
+
+def test_iter_bits():
+    assert list(iter_bits(0b101001)) == [0, 3, 5]
+    assert list(iter_bits(0)) == []
+
+
+class TestKeywordRanking:
+    """Test cases for keyword relevance ranking."""
+
+    def setup_method(self):
+        self.index = JokeIndex()
+        jokes = [make_joke(i, joke_type="single") for i in range(1, 7)]
+        jokes[0]["joke"] = "A bug walks into a database"
+        jokes[1]["joke"] = "Debugging a database bug at midnight"
+        jokes[2]["joke"] = "The server crashed"
+        jokes[3]["joke"] = "Bugs everywhere"
+        self.index.add_jokes(jokes)
+        self.mask = self.index.query(category="Programming")
+
+    def test_most_matching_terms_first(self):
+        ranked = self.index.rank(["bugs", "database", "midnight"], self.mask, 3)
+        assert [joke["id"] for joke in ranked] == [2, 1, 4]
+
+    def test_no_match_and_limit(self):
+        assert self.index.rank(["unicorn"], self.mask, 3) == []
+        assert len(self.index.rank(["bug"], self.mask, 1)) == 1
+
+    def test_respects_mask(self):
+        mask = self.index.mask_for_ids([3, 4])
+        assert [joke["id"] for joke in self.index.rank(["bug", "database"], mask, 5)] == [4]
@@ -58,4 +58,100 @@ class TestLLMService:
         )
         
         assert isinstance(result, str)
-        assert len(result) > 0 
\ No newline at end of file
+        assert len(result) > 0 
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("window_ms", [0, 1])
+async def test_failed_llm_analysis_not_cached(window_ms, stub_openai):
+    def create(**kwargs):
+        raise RuntimeError("429 Too Many Requests")
+
+    llm_service = LLMService()
+    llm_service.batcher.window_ms = window_ms
+    stub_openai(llm_service, create)
+
+    result = await llm_service.analyze_request("I need programming jokes")
+
+    assert result == llm_service._fallback_analysis("I need programming jokes")
+    assert llm_service.analysis_cache.get("i need programming jokes") is None
+
+
+@pytest.mark.asyncio
+async def test_limiter_tracks_real_llm_calls_only(stub_openai):
+    def create(**kwargs):
+        raise RuntimeError("503 Service Unavailable")
+
+    llm_service = LLMService()
+    llm_service.batcher.window_ms = 0
+    stub_openai(llm_service, create)
+    llm_service.analysis_cache.set("cached request", {"category": "Pun"})
+    limit = llm_service.limiter.limit
+
+    await llm_service.analyze_request("cached request")
+    assert llm_service.limiter.accepted == 0
+
+    # A fast failure backs the limit off rather than counting as a success
+    await llm_service.analyze_request("I need programming jokes")
+    assert llm_service.limiter.accepted == 1
+    assert llm_service.limiter.limit < limit
+
+
+@pytest.mark.asyncio
+async def test_cached_context_response_does_not_see_jokes(stub_openai):
+    messages = []
+
+    def create(**kwargs):
+        messages.append(kwargs["messages"][-1]["content"])
+        return "Enjoy!"
+
+    llm_service = LLMService()
+    stub_openai(llm_service, create)
+
+    first = await llm_service.generate_response_context("pun please", [{"joke": "A served pun"}])
+    second = await llm_service.generate_response_context("pun please", [{"joke": "Another pun"}])
+
+    assert first == second == "Enjoy!"
+    assert messages == ["User request: pun please"]
+
+
+@pytest.mark.asyncio
+async def test_unbatched_llm_calls_run_off_the_event_loop(stub_openai):
+    import threading
+    threads = []
+
+    def create(**kwargs):
+        threads.append(threading.current_thread())
+        return '{"category": "Pun", "keywords": [], "reasoning": "r", "user_mood": "happy", "suggested_amount": 1}'
+
+    llm_service = LLMService()
+    llm_service.batcher.window_ms = 0
+    stub_openai(llm_service, create)
+
+    await llm_service.analyze_request("a pun please")
+    await llm_service.generate_response_context("a pun please", [])
+
+    assert len(threads) == 2
+    assert threading.main_thread() not in threads
+
+
+@pytest.mark.asyncio
+async def test_failed_context_response_not_cached(stub_openai):
+    def create(**kwargs):
+        raise RuntimeError("500 Internal Server Error")
+
+    llm_service = LLMService()
+    stub_openai(llm_service, create)
+
+    result = await llm_service.generate_response_context("pun please", [])
+
+    assert result == llm_service._fallback_response_context("pun please")
+    assert llm_service.context_cache.get("pun please") is None
+
+
+def test_llm_client_is_created_lazily(monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    service = LLMService()
+    assert service._client_initialized is False
+    assert service._is_llm_available() is False
+    assert service._client_initialized is True
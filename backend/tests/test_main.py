@@ -1,3 +1,4 @@
+import pytest
 from fastapi.testclient import TestClient
 from app.main import app, extract_category
 
@@ -49,4 +50,110 @@ def test_category_extraction():
     assert extract_category("Tell me a programming joke") == "Programming"
     assert extract_category("I want a dark joke") == "Dark"
     assert extract_category("Share a pun with me") == "Pun"
-    assert extract_category("Any joke will do") == "Any" 
\ No newline at end of file
+    assert extract_category("Any joke will do") == "Any" 
+
+
+def test_filtered_search_served_from_index():
+    from app.main import joke_index
+    joke_index.add_jokes([
+        {"id": 9001 + i, "category": "Programming", "type": "single", "lang": "en", "safe": True,
+         "joke": f"Indexed recursion joke {i}", "flags": {"nsfw": False}}
+        for i in range(3)
+    ])
+    response = client.get("/api/search?query=indexed recursion&category=Programming&type=single&safe=true&amount=2")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total"] == 2
+    assert data["has_more"] is True
+    assert all(joke["is_safe"] for joke in data["jokes"])
+
+
+def test_unknown_blacklist_flag():
+    response = client.get("/api/search?query=bug&blacklist_flags=boring")
+    assert response.status_code == 400
+
+
+def shed_only(**kwargs):
+    raise AssertionError("a shed request must not reach the LLM")
+
+
+def test_analyze_sheds_when_llm_saturated(monkeypatch, stub_openai):
+    from app.main import llm_limiter, llm_service
+    stub_openai(llm_service, shed_only)
+    monkeypatch.setattr(llm_limiter, "_limit", 0.0)
+    response = client.post("/api/analyze", json={"request": "Tell me a joke"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"]
+
+
+def test_ask_uses_fallback_when_llm_saturated(monkeypatch, stub_openai):
+    from app.main import llm_limiter, llm_service, joke_index
+    joke_index.add_jokes([
+        {"id": 9101, "category": "Programming", "type": "single", "lang": "en", "safe": True,
+         "joke": "Saturated joke", "flags": {}}
+    ])
+    stub_openai(llm_service, shed_only)
+    monkeypatch.setattr(llm_limiter, "_limit", 0.0)
+    response = client.post("/api/ask?safe=true", json={"request": "Tell me a programming joke"})
+    assert response.status_code == 200
+    assert "capacity" in response.json()["ai_analysis"]["reasoning"]
+
+
+def test_session_does_not_repeat_jokes():
+    from app.main import joke_index
+    joke_index.add_jokes([
+        {"id": 9201 + i, "category": "Pun", "type": "single", "lang": "en", "safe": True,
+         "joke": f"Session pun {i}", "flags": {}}
+        for i in range(4)
+    ])
+    headers = {"X-Session-Id": "no-repeat-test"}
+    url = "/api/search?query=session pun&category=Pun&safe=true&amount=2"
+    first = client.get(url, headers=headers).json()["jokes"]
+    second = client.get(url, headers=headers).json()["jokes"]
+    texts = [joke["joke"] for joke in first + second]
+    assert len(texts) == 4
+    assert len(set(texts)) == 4
+
+
+def test_upstream_client_errors_keep_the_limit(monkeypatch):
+    import requests
+    from app.main import jokeapi_get, upstream_limiter, UpstreamError
+    calls = []
+
+    def fake_get(url, params=None, timeout=None):
+        calls.append(timeout)
+        response = requests.models.Response()
+        response.status_code = 400 if "idRange" in (params or {}) else 503
+        return response
+
+    monkeypatch.setattr(requests, "get", fake_get)
+    monkeypatch.setattr(upstream_limiter, "_limit", 20.0)
+    monkeypatch.setattr(upstream_limiter, "_last_decrease", 0.0)
+
+    for _ in range(3):
+        with pytest.raises(UpstreamError):
+            jokeapi_get("/joke/Any", {"idRange": 424242})
+    assert upstream_limiter.limit >= 20
+    assert all(timeout for timeout in calls)
+
+    with pytest.raises(UpstreamError):
+        jokeapi_get("/joke/Any")
+    assert upstream_limiter.limit < 20
+
+
+def test_hot_category_served_from_index(monkeypatch):
+    import app.main as main
+
+    def no_upstream(*args, **kwargs):
+        raise AssertionError("hot categories should be served from the index")
+
+    main.joke_index.add_jokes([
+        {"id": 9401 + i, "category": "Christmas", "type": "single", "lang": "en", "safe": True,
+         "joke": f"Hot christmas joke {i}", "flags": {}}
+        for i in range(main.RELEVANT_CANDIDATES)
+    ])
+    monkeypatch.setattr(main, "fetch_jokes", no_upstream)
+    monkeypatch.setattr(main, "hot_categories", {"Christmas"})
+
+    assert len(main.select_jokes("Christmas", 2)) == 2
+    assert len(main.select_relevant_jokes("Christmas", 2, ["christmas"])) == 2
@@ -0,0 +1,70 @@
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import profiling
+from app.main import app
+
+client = TestClient(app)
+
+
+def busy_loop(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_sample_stacks_sees_other_threads():
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_loop, args=(stop,))
+    worker.start()
+    try:
+        stacks = profiling.sample_stacks(0.05, interval=0.001)
+    finally:
+        stop.set()
+        worker.join()
+
+    assert any(stack.endswith("test_profiling.py:busy_loop") for stack in stacks)
+    assert "sample_stacks" not in profiling.format_collapsed(stacks)
+
+
+@pytest.mark.asyncio
+async def test_memory_diff_stops_tracemalloc():
+    import tracemalloc
+
+    top = await profiling.memory_snapshot_diff(0.01, limit=5)
+    assert isinstance(top, list)
+    assert not tracemalloc.is_tracing()
+
+
+class TestProfileEndpoints:
+    """Test cases for the admin profiling endpoints."""
+
+    def test_disabled_without_admin_token(self, monkeypatch):
+        monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+        assert client.post("/api/admin/profile/cpu?seconds=0.01").status_code == 404
+
+    def test_rejects_wrong_token(self, monkeypatch):
+        monkeypatch.setenv("ADMIN_TOKEN", "secret")
+        response = client.post("/api/admin/profile/cpu?seconds=0.01", headers={"X-Admin-Token": "nope"})
+        assert response.status_code == 401
+
+    def test_rejects_non_ascii_token(self, monkeypatch):
+        monkeypatch.setenv("ADMIN_TOKEN", "secret")
+        response = client.post("/api/admin/profile/cpu?seconds=0.01", headers={"X-Admin-Token": "sécret".encode("utf-8")})
+        assert response.status_code == 401
+
+    def test_cprofile_capture(self, monkeypatch):
+        monkeypatch.setenv("ADMIN_TOKEN", "secret")
+        response = client.post(
+            "/api/admin/profile/cpu?seconds=0.01&mode=cprofile",
+            headers={"X-Admin-Token": "secret"}
+        )
+        assert response.status_code == 200
+        assert "function calls" in response.text
+
+    def test_memory_capture(self, monkeypatch):
+        monkeypatch.setenv("ADMIN_TOKEN", "secret")
+        response = client.post("/api/admin/profile/memory?seconds=0.01", headers={"X-Admin-Token": "secret"})
+        assert response.status_code == 200
+        assert "top" in response.json()
@@ -0,0 +1,30 @@
+import time
+
+from app.sessions import SessionStore
+
+
+class TestSessionStore:
+    """Test cases for per-session seen-joke tracking."""
+
+    def test_same_id_same_session(self):
+        store = SessionStore()
+        store.get("a").mark_seen(0b101)
+        assert store.get("a").seen == 0b101
+        assert store.get("b").seen == 0
+
+    def test_cap_evicts_least_recently_used(self):
+        store = SessionStore(max_sessions=2)
+        store.get("a").mark_seen(1)
+        store.get("b")
+        store.get("a")
+        store.get("c")
+        assert len(store) == 2
+        assert store.get("a").seen == 1
+        assert store.stats()["evicted"] == 1
+
+    def test_idle_sessions_evicted(self):
+        store = SessionStore(idle_ttl=0.01)
+        store.get("a").mark_seen(1)
+        time.sleep(0.02)
+        assert store.get("a").seen == 0
+        assert store.stats()["evicted"] == 1
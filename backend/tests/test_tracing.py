@@ -0,0 +1,76 @@
+import json
+import time
+
+from app.tracing import Tracer, JsonlTraceExporter, current_trace_id
+
+
+def read_traces(path):
+    with open(path) as stream:
+        return [json.loads(line) for line in stream]
+
+
+class TestTracer:
+    """Test cases for request tracing."""
+
+    def test_nested_spans_exported(self, tmp_path):
+        exporter = JsonlTraceExporter(str(tmp_path / "traces.jsonl"))
+        tracer = Tracer(exporter, sample_rate=1.0)
+
+        with tracer.trace("POST /api/ask") as trace:
+            assert current_trace_id() == trace.trace_id
+            with tracer.span("analyze_request") as outer:
+                with tracer.span("http GET jokeapi", path="/joke/Any"):
+                    pass
+        exporter.close()
+
+        [exported] = read_traces(tmp_path / "traces.jsonl")
+        assert exported["trace_id"] == trace.trace_id
+        spans = {span["name"]: span for span in exported["spans"]}
+        assert spans["http GET jokeapi"]["parent_id"] == outer["span_id"]
+        assert spans["analyze_request"]["parent_id"] is None
+        assert current_trace_id() is None
+
+    def test_slow_traces_always_kept(self, tmp_path):
+        exporter = JsonlTraceExporter(str(tmp_path / "traces.jsonl"))
+        tracer = Tracer(exporter, sample_rate=0.0, slow_ms=5)
+
+        with tracer.trace("fast"):
+            pass
+        with tracer.trace("slow"):
+            time.sleep(0.01)
+        exporter.close()
+
+        assert [trace["name"] for trace in read_traces(tmp_path / "traces.jsonl")] == ["slow"]
+
+    def test_span_records_error(self, tmp_path):
+        exporter = JsonlTraceExporter(str(tmp_path / "traces.jsonl"))
+        tracer = Tracer(exporter, sample_rate=1.0)
+
+        with tracer.trace("request"):
+            try:
+                with tracer.span("parse_json"):
+                    raise ValueError("bad json")
+            except ValueError:
+                pass
+        exporter.close()
+
+        [exported] = read_traces(tmp_path / "traces.jsonl")
+        assert "bad json" in exported["spans"][0]["error"]
+
+    def test_disabled_tracer_is_noop(self):
+        tracer = Tracer()
+        with tracer.trace("request") as trace:
+            with tracer.span("analyze_request") as span:
+                assert trace is None and span is None
+
+
+def test_exporter_rotates(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    exporter = JsonlTraceExporter(str(path), max_bytes=200, backups=2)
+    for i in range(20):
+        exporter.export({"trace_id": str(i), "padding": "x" * 50})
+    exporter.close()
+
+    assert (tmp_path / "traces.jsonl.1").exists()
+    assert (tmp_path / "traces.jsonl.2").exists()
+    assert not (tmp_path / "traces.jsonl.3").exists()
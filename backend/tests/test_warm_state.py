@@ -0,0 +1,54 @@
+import time
+
+from app.cache import TTLCache
+from app.joke_index import JokeIndex
+from app.warm_state import save_snapshot, load_snapshot
+
+
+def make_state():
+    index = JokeIndex()
+    index.add_jokes([
+        {"id": 1, "category": "Pun", "type": "single", "lang": "en", "safe": True, "joke": "A pun", "flags": {}},
+        {"id": 2, "category": "Dark", "type": "single", "lang": "en", "safe": False, "joke": "Dark", "flags": {}},
+    ])
+    cache = TTLCache()
+    cache.set("tell me a pun", {"category": "Pun"})
+    cache.set("expired", {"category": "Any"}, expires_at=time.time() - 1)
+    return index, cache
+
+
+class TestWarmState:
+    """Test cases for the warm-state snapshot."""
+
+    def test_round_trip(self, tmp_path):
+        path = str(tmp_path / "warm_state.bin")
+        index, cache = make_state()
+        assert save_snapshot(path, index, cache) > 0
+
+        restored_index, restored_cache = JokeIndex(), TTLCache()
+        restored = load_snapshot(path, restored_index, restored_cache)
+
+        assert restored["jokes"] == 2
+        assert restored["analysis_cache"] == 1
+        assert restored_index.count(restored_index.query(category="Pun", safe=True)) == 1
+        assert restored_cache.get("tell me a pun") == {"category": "Pun"}
+        assert restored_cache.get("expired") is None
+
+    def test_missing_or_corrupt_snapshot(self, tmp_path):
+        assert load_snapshot(str(tmp_path / "missing.bin"), JokeIndex(), TTLCache()) == {}
+        corrupt = tmp_path / "corrupt.bin"
+        corrupt.write_bytes(b"not a snapshot")
+        assert load_snapshot(str(corrupt), JokeIndex(), TTLCache()) == {}
+
+
+class TestTTLCache:
+    """Test cases for the TTL/LRU cache."""
+
+    def test_lru_eviction(self):
+        cache = TTLCache(max_size=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        assert cache.get("b") is None
+        assert cache.get("a") == 1 and cache.get("c") == 3
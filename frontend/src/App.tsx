@@ -1,7 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import './App.css';
 import { JokeResponse, AIAnalysis } from './types/joke';
-import { jokeService } from './services/jokeService';
+import { jokeService, isAbortError } from './services/jokeService';
 import { JokeDisplay } from './components/JokeDisplay';
 import { JokeRequestSection } from './components/JokeRequestSection';
 import { AIAnalysisDisplay } from './components/AIAnalysisDisplay';
@@ -103,10 +103,12 @@ function App() {
         amount
       );
       updateTabJokes('search', data.jokes, data.has_more);
+      setLoading(false);
     } catch (err) {
+      // A newer search took over; leave the UI to it
+      if (isAbortError(err)) return;
       handleError(err);
       updateTabJokes('search', [], false);
-    } finally {
       setLoading(false);
     }
   };
@@ -143,9 +145,11 @@ function App() {
         );
         updateTabJokes('search', data.jokes, data.has_more, tabJokes.search.currentPage + 1);
       }
+      setLoading(false);
     } catch (err) {
+      // A newer search took over; leave the UI to it
+      if (isAbortError(err)) return;
       handleError(err);
-    } finally {
       setLoading(false);
     }
   };
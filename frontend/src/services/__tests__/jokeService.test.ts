@@ -1,11 +1,12 @@
-import { jokeService } from '../jokeService';
+import { jokeService, isAbortError } from '../jokeService';
 
 // Mock fetch
 global.fetch = jest.fn();
 
 describe('jokeService', () => {
   beforeEach(() => {
-    (global.fetch as jest.Mock).mockClear();
+    (global.fetch as jest.Mock).mockReset();
+    jokeService.clearCache();
   });
 
   describe('askForJoke', () => {
@@ -65,9 +66,58 @@ describe('jokeService', () => {
       const result = await jokeService.searchJoke('programming', 'Programming', 1, 5);
       expect(result).toEqual(mockResponse);
       expect(global.fetch).toHaveBeenCalledWith(
-        'http://localhost:8000/api/search?query=programming&category=Programming&page=1&amount=5'
+        'http://localhost:8000/api/search?query=programming&category=Programming&page=1&amount=5',
+        { signal: expect.any(Object) }
       );
     });
+
+    it('should prefetch the next page and serve it from the cache', async () => {
+      const page = (n: number) => ({
+        jokes: [{ category: 'Programming', joke: `Joke ${n}`, is_safe: true }],
+        total: 1,
+        page: n,
+        has_more: n === 1
+      });
+
+      (global.fetch as jest.Mock)
+        .mockResolvedValueOnce({ ok: true, json: () => Promise.resolve(page(1)) })
+        .mockResolvedValueOnce({ ok: true, json: () => Promise.resolve(page(2)) });
+
+      await jokeService.searchJoke('bug', 'Programming', 1, 5);
+      expect(global.fetch).toHaveBeenLastCalledWith(
+        'http://localhost:8000/api/search?query=bug&category=Programming&page=2&amount=5',
+        expect.any(Object)
+      );
+
+      const next = await jokeService.searchJoke('bug', 'Programming', 2, 5);
+      expect(next).toEqual(page(2));
+      expect(global.fetch).toHaveBeenCalledTimes(2);
+    });
+
+    it('should abort a search superseded by a different one', async () => {
+      (global.fetch as jest.Mock).mockImplementation((url: string, init: RequestInit) => {
+        if (url.includes('query=first')) {
+          return new Promise((_, reject) => {
+            init.signal!.addEventListener('abort', () => {
+              const error = new Error('The operation was aborted.');
+              error.name = 'AbortError';
+              reject(error);
+            });
+          });
+        }
+        return Promise.resolve({
+          ok: true,
+          json: () => Promise.resolve({ jokes: [], total: 0, page: 1, has_more: false })
+        });
+      });
+
+      const first = jokeService.searchJoke('first', 'Any');
+      const second = jokeService.searchJoke('second', 'Any');
+
+      const error = await first.catch(err => err);
+      expect(isAbortError(error)).toBe(true);
+      await expect(second).resolves.toEqual({ jokes: [], total: 0, page: 1, has_more: false });
+    });
   });
 
   describe('getJokeById', () => {
@@ -95,6 +145,17 @@ describe('jokeService', () => {
         is_safe: true
       });
     });
+
+    it('should share one request between concurrent identical calls', async () => {
+      (global.fetch as jest.Mock).mockResolvedValueOnce({
+        ok: true,
+        json: () => Promise.resolve({ category: 'Pun', joke: 'A pun', safe: true })
+      });
+
+      const [a, b] = await Promise.all([jokeService.getJokeById('7'), jokeService.getJokeById('7')]);
+      expect(a).toEqual(b);
+      expect(global.fetch).toHaveBeenCalledTimes(1);
+    });
   });
 
   describe('getCategories', () => {
@@ -111,5 +172,25 @@ describe('jokeService', () => {
       const result = await jokeService.getCategories();
       expect(result).toEqual(['Programming', 'Misc', 'Dark']);
     });
+
+    it('should cache categories', async () => {
+      (global.fetch as jest.Mock).mockResolvedValueOnce({
+        ok: true,
+        json: () => Promise.resolve({ categories: ['Pun'] })
+      });
+
+      await jokeService.getCategories();
+      expect(await jokeService.getCategories()).toEqual(['Pun']);
+      expect(global.fetch).toHaveBeenCalledTimes(1);
+    });
+
+    it('should not cache failures', async () => {
+      (global.fetch as jest.Mock)
+        .mockResolvedValueOnce({ ok: false })
+        .mockResolvedValueOnce({ ok: true, json: () => Promise.resolve({ categories: ['Pun'] }) });
+
+      await expect(jokeService.getCategories()).rejects.toThrow('Failed to fetch categories');
+      expect(await jokeService.getCategories()).toEqual(['Pun']);
+    });
   });
 }); 
\ No newline at end of file
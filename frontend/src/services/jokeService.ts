@@ -2,6 +2,63 @@ import { JokeResponse, JokesResponse, JokeAPIResponse, CategoriesResponse, JokeR
 
 const API_BASE_URL = 'http://localhost:8000';
 
+const SEARCH_TTL_MS = 60 * 1000;
+const STATIC_TTL_MS = 10 * 60 * 1000;
+const MAX_CACHE_ENTRIES = 200;
+
+// Responses by request URL, and requests still in flight so identical calls share one fetch
+const responseCache = new Map<string, { value: unknown; expiresAt: number }>();
+const inFlight = new Map<string, Promise<unknown>>();
+// The latest search the UI is waiting on; a search for a different URL aborts it
+let activeSearch: { url: string; controller: AbortController } | null = null;
+
+function cached<T>(key: string, ttlMs: number, load: () => Promise<T>): Promise<T> {
+  const hit = responseCache.get(key);
+  if (hit && hit.expiresAt > Date.now()) {
+    return Promise.resolve(hit.value as T);
+  }
+  const pending = inFlight.get(key);
+  if (pending) {
+    return pending as Promise<T>;
+  }
+
+  const promise = load()
+    .then(value => {
+      responseCache.delete(key);
+      if (responseCache.size >= MAX_CACHE_ENTRIES) {
+        responseCache.delete(responseCache.keys().next().value as string);
+      }
+      responseCache.set(key, { value, expiresAt: Date.now() + ttlMs });
+      return value;
+    })
+    .finally(() => {
+      if (inFlight.get(key) === promise) {
+        inFlight.delete(key);
+      }
+    });
+  inFlight.set(key, promise);
+  return promise;
+}
+
+function searchUrl(query: string, category: string, page: number, amount: number): string {
+  return `${API_BASE_URL}/api/search?query=${encodeURIComponent(query)}&category=${encodeURIComponent(category)}&page=${page}&amount=${amount}`;
+}
+
+async function fetchSearch(url: string, signal?: AbortSignal): Promise<JokesResponse> {
+  const response = await fetch(url, { signal });
+
+  if (!response.ok) {
+    throw new Error('Failed to search jokes');
+  }
+
+  return response.json();
+}
+
+// fetch rejects with a DOMException, which is not an Error subclass everywhere
+export function isAbortError(err: unknown): boolean {
+  return typeof err === 'object' && err !== null && (err as Error).name === 'AbortError';
+}
+
 export const jokeService = {
   async askForJoke(request: string, amount: number = 1): Promise<JokesResponse> {
     const response = await fetch(`${API_BASE_URL}/api/ask?amount=${amount}`, {
@@ -19,43 +76,68 @@ export const jokeService = {
     return response.json();
   },
 
-  async searchJoke(query: string, category: string, page: number = 1, amount: number = 5): Promise<JokesResponse> {
-    const response = await fetch(
-      `${API_BASE_URL}/api/search?query=${encodeURIComponent(query)}&category=${encodeURIComponent(category)}&page=${page}&amount=${amount}`
-    );
+  searchJoke(query: string, category: string, page: number = 1, amount: number = 5): Promise<JokesResponse> {
+    const url = searchUrl(query, category, page, amount);
 
-    if (!response.ok) {
-      throw new Error('Failed to search jokes');
+    const search = activeSearch && activeSearch.url === url
+      ? activeSearch
+      : { url, controller: new AbortController() };
+    if (activeSearch && activeSearch !== search) {
+      activeSearch.controller.abort();
+      inFlight.delete(activeSearch.url);
     }
+    activeSearch = search;
 
-    return response.json();
+    return cached(url, SEARCH_TTL_MS, async () => {
+      const data = await fetchSearch(url, search.controller.signal);
+      if (data.has_more) {
+        // Warm the next page so "Load more" is answered from the cache
+        const nextUrl = searchUrl(query, category, page + 1, amount);
+        cached(nextUrl, SEARCH_TTL_MS, () => fetchSearch(nextUrl)).catch(() => undefined);
+      }
+      return data;
+    }).finally(() => {
+      if (activeSearch === search) {
+        activeSearch = null;
+      }
+    });
   },
 
-  async getJokeById(id: string): Promise<JokeResponse> {
-    const response = await fetch(`${API_BASE_URL}/api/joke/${id}`);
+  getJokeById(id: string): Promise<JokeResponse> {
+    return cached(`joke:${id}`, STATIC_TTL_MS, async () => {
+      const response = await fetch(`${API_BASE_URL}/api/joke/${id}`);
 
-    if (!response.ok) {
-      throw new Error('Failed to fetch joke');
-    }
+      if (!response.ok) {
+        throw new Error('Failed to fetch joke');
+      }
 
-    const data: JokeAPIResponse = await response.json();
-    return {
-      category: data.category,
-      setup: data.setup,
-      delivery: data.delivery,
-      joke: data.joke,
-      is_safe: data.safe,
-    };
+      const data: JokeAPIResponse = await response.json();
+      return {
+        category: data.category,
+        setup: data.setup,
+        delivery: data.delivery,
+        joke: data.joke,
+        is_safe: data.safe,
+      };
+    });
   },
 
-  async getCategories(): Promise<string[]> {
-    const response = await fetch(`${API_BASE_URL}/api/categories`);
+  getCategories(): Promise<string[]> {
+    return cached('categories', STATIC_TTL_MS, async () => {
+      const response = await fetch(`${API_BASE_URL}/api/categories`);
 
-    if (!response.ok) {
-      throw new Error('Failed to fetch categories');
-    }
+      if (!response.ok) {
+        throw new Error('Failed to fetch categories');
+      }
+
+      const data: CategoriesResponse = await response.json();
+      return data.categories;
+    });
+  },
 
-    const data: CategoriesResponse = await response.json();
-    return data.categories;
+  clearCache(): void {
+    responseCache.clear();
+    inFlight.clear();
+    activeSearch = null;
   },
 }; 
\ No newline at end of file